@@ -3,104 +3,109 @@
 Demo script showing LGTM Bot output with mock data.
 """
 
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.text import Text
+import json
 from datetime import datetime
 
 def demo_lgtm_output():
     """Show a realistic LGTM Bot output demo."""
+    # rich is only needed for the console demo
+    from rich.console import Console
+    from rich.table import Table
+    from rich.panel import Panel
+    from rich.text import Text
+    
     console = Console()
     
-    # Header
-    console.print()
-    header_text = """
+    # Buffer every print and write the whole demo to the terminal at once
+    with console:
+        # Header
+        console.print()
+        header_text = """
 📋 **Ticket:** PROJ-123 - Implement user authentication system
 🔀 **PR:** #456 - Add JWT authentication with password validation
 👤 **Author:** developer-jane
 📊 **Score:** 87.5%
 🤖 **AI Model:** deepseek-r1:latest (Ollama)
 """
-    
-    status_text = Text("Review Status: PASS", style="bold green")
-    
-    panel = Panel(
-        header_text + "\n" + str(status_text),
-        title="🤖 LGTM Bot Review Results",
-        border_style="blue",
-        padding=(1, 2)
-    )
-    
-    console.print(panel)
-    console.print()
-    
-    # Summary
-    console.print("## 📋 Summary", style="bold")
-    console.print("**Review Status:** PASS")
-    console.print("**Overall Score:** 87.5%")
-    console.print("**Acceptance Criteria:** 3/3 fulfilled")
-    console.print("**Code Quality Issues:** 2")
-    console.print("**Test Coverage:** ✅")
-    console.print()
-    
-    # Acceptance Criteria Table
-    table = Table(title="🎯 Acceptance Criteria Analysis")
-    table.add_column("Criterion", style="cyan", no_wrap=False, max_width=40)
-    table.add_column("Status", justify="center")
-    table.add_column("Confidence", justify="center")
-    table.add_column("Notes", style="yellow", no_wrap=False, max_width=30)
-    
-    criteria = [
-        ("User can login with valid credentials", "✅", "95%", "✓ JWT token generation\n✓ Login endpoint implemented"),
-        ("Password validation implemented", "✅", "88%", "✓ bcrypt hashing\n✓ Strength validation"),
-        ("Session management with tokens", "✅", "92%", "✓ Token refresh logic\n✓ Secure storage"),
-    ]
-    
-    for criterion, status, confidence, notes in criteria:
-        table.add_row(criterion, status, confidence, notes)
-    
-    console.print(table)
-    console.print()
-    
-    # Code Quality Issues
-    console.print("[bold yellow]💡 Suggestions for Improvement[/bold yellow]")
-    console.print("  • auth.py: Line exceeds 120 characters (135 chars)")
-    console.print("  • utils.py: Consider extracting password validation to separate function")
-    console.print()
-    
-    # Test Analysis
-    console.print("[bold]🧪 Test Analysis[/bold]")
-    console.print("  ✅ Status: Good test coverage detected")
-    console.print("  📁 Test Files:")
-    console.print("    • test_auth.py")
-    console.print("    • test_password_validation.py")
-    console.print()
-    
-    # Recommended Tests
-    console.print("[bold blue]🧪 Recommended Test Cases[/bold blue]")
-    console.print("  • Test case for: User can login with valid credentials")
-    console.print("  • Test case for: Password validation implemented")
-    console.print("  • Edge case: Login with expired token")
-    console.print()
-    
-    # Final Verdict
-    lgtm_panel = Panel(
-        "LGTM! ✅ Solid implementation that meets requirements with good practices.",
-        title="🚀 Final Verdict",
-        border_style="green",
-        padding=(1, 2)
-    )
-    console.print(lgtm_panel)
-    console.print()
-    
-    # What AI Analysis Found
-    console.print("[bold]🧠 AI Analysis Highlights:[/bold]")
-    console.print("  • [green]Security:[/green] Proper password hashing with bcrypt")
-    console.print("  • [green]Performance:[/green] Efficient token validation")
-    console.print("  • [green]Maintainability:[/green] Clean separation of concerns")
-    console.print("  • [yellow]Suggestion:[/yellow] Add rate limiting for login attempts")
-    console.print()
+        
+        status_text = Text("Review Status: PASS", style="bold green")
+        
+        panel = Panel(
+            header_text + "\n" + str(status_text),
+            title="🤖 LGTM Bot Review Results",
+            border_style="blue",
+            padding=(1, 2)
+        )
+        
+        console.print(panel)
+        console.print()
+        
+        # Summary
+        console.print("## 📋 Summary", style="bold")
+        console.print("**Review Status:** PASS")
+        console.print("**Overall Score:** 87.5%")
+        console.print("**Acceptance Criteria:** 3/3 fulfilled")
+        console.print("**Code Quality Issues:** 2")
+        console.print("**Test Coverage:** ✅")
+        console.print()
+        
+        # Acceptance Criteria Table
+        table = Table(title="🎯 Acceptance Criteria Analysis")
+        table.add_column("Criterion", style="cyan", no_wrap=False, max_width=40)
+        table.add_column("Status", justify="center")
+        table.add_column("Confidence", justify="center")
+        table.add_column("Notes", style="yellow", no_wrap=False, max_width=30)
+        
+        criteria = [
+            ("User can login with valid credentials", "✅", "95%", "✓ JWT token generation\n✓ Login endpoint implemented"),
+            ("Password validation implemented", "✅", "88%", "✓ bcrypt hashing\n✓ Strength validation"),
+            ("Session management with tokens", "✅", "92%", "✓ Token refresh logic\n✓ Secure storage"),
+        ]
+        
+        for criterion, status, confidence, notes in criteria:
+            table.add_row(criterion, status, confidence, notes)
+        
+        console.print(table)
+        console.print()
+        
+        # Code Quality Issues
+        console.print("[bold yellow]💡 Suggestions for Improvement[/bold yellow]")
+        console.print("  • auth.py: Line exceeds 120 characters (135 chars)")
+        console.print("  • utils.py: Consider extracting password validation to separate function")
+        console.print()
+        
+        # Test Analysis
+        console.print("[bold]🧪 Test Analysis[/bold]")
+        console.print("  ✅ Status: Good test coverage detected")
+        console.print("  📁 Test Files:")
+        console.print("    • test_auth.py")
+        console.print("    • test_password_validation.py")
+        console.print()
+        
+        # Recommended Tests
+        console.print("[bold blue]🧪 Recommended Test Cases[/bold blue]")
+        console.print("  • Test case for: User can login with valid credentials")
+        console.print("  • Test case for: Password validation implemented")
+        console.print("  • Edge case: Login with expired token")
+        console.print()
+        
+        # Final Verdict
+        lgtm_panel = Panel(
+            "LGTM! ✅ Solid implementation that meets requirements with good practices.",
+            title="🚀 Final Verdict",
+            border_style="green",
+            padding=(1, 2)
+        )
+        console.print(lgtm_panel)
+        console.print()
+        
+        # What AI Analysis Found
+        console.print("[bold]🧠 AI Analysis Highlights:[/bold]")
+        console.print("  • [green]Security:[/green] Proper password hashing with bcrypt")
+        console.print("  • [green]Performance:[/green] Efficient token validation")
+        console.print("  • [green]Maintainability:[/green] Clean separation of concerns")
+        console.print("  • [yellow]Suggestion:[/yellow] Add rate limiting for login attempts")
+        console.print()
 
 def demo_markdown_output():
     """Show what markdown output looks like."""
@@ -148,8 +153,6 @@ LGTM! ✅ Solid implementation that meets requirements with good practices.
 
 def demo_json_output():
     """Show what JSON output looks like."""
-    import json
-    
     json_output = {
         "review_metadata": {
             "timestamp": "2024-01-15T14:30:25",
@@ -195,20 +198,28 @@ def demo_json_output():
 if __name__ == "__main__":
     import sys
     
-    console = Console()
-    console.print("🎭 LGTM Bot Output Demo", style="bold blue")
-    console.print("=" * 40)
-    console.print()
-    
-    if len(sys.argv) > 1 and sys.argv[1] == "markdown":
-        console.print("📝 Markdown Output:", style="bold")
-        console.print("-" * 20)
-        demo_markdown_output()
-    elif len(sys.argv) > 1 and sys.argv[1] == "json":
-        console.print("📊 JSON Output:", style="bold")
-        console.print("-" * 20)
-        demo_json_output()
+    if len(sys.argv) > 1 and sys.argv[1] in ("markdown", "json"):
+        # Plain-text output: no need to load rich
+        print("🎭 LGTM Bot Output Demo")
+        print("=" * 40)
+        print()
+        
+        if sys.argv[1] == "markdown":
+            print("📝 Markdown Output:")
+            print("-" * 20)
+            demo_markdown_output()
+        else:
+            print("📊 JSON Output:")
+            print("-" * 20)
+            demo_json_output()
     else:
+        from rich.console import Console
+        
+        console = Console()
+        console.print("🎭 LGTM Bot Output Demo", style="bold blue")
+        console.print("=" * 40)
+        console.print()
+        
         console.print("🎨 Console Output (Default):", style="bold")
         console.print("-" * 30)
         demo_lgtm_output()
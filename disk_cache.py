@@ -0,0 +1,84 @@
+"""
+Disk Cache Module
+
+TTL-bounded JSON cache stored under ~/.cache/lgtm-bot/ for API responses.
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CACHE_ROOT = Path(os.getenv("LGTM_BOT_CACHE_DIR", "~/.cache/lgtm-bot")).expanduser()
+
+class DiskCache:
+    """Stores JSON-serializable values on disk, one file per key."""
+
+    def __init__(self, namespace: str, ttl_seconds: float, enabled: bool = True, refresh: bool = False):
+        """
+        Initialize a cache namespace.
+
+        Args:
+            namespace: Subdirectory of the cache root (e.g., 'jira')
+            ttl_seconds: Maximum age of an entry before it is ignored
+            enabled: When False, reads miss and writes are skipped
+            refresh: When True, reads miss but fresh values are still written
+        """
+        self.directory = CACHE_ROOT / namespace
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.refresh = refresh
+
+    def _path(self, key: str) -> Path:
+        """Map a cache key to its file path."""
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on miss or expiry."""
+        if not self.enabled or self.refresh:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+        if time.time() - entry.get("stored_at", 0) > self.ttl_seconds:
+            self._remove(path)
+            return None
+
+        return entry.get("value")
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value under key; failures are logged and ignored."""
+        if not self.enabled:
+            return
+
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding="utf-8") as f:
+                json.dump({"stored_at": time.time(), "value": value}, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except Exception as e:
+            logger.warning(f"Could not write cache entry to {self.directory}: {e}")
+
+    def _remove(self, path: Path) -> None:
+        """Delete an expired entry."""
+        try:
+            path.unlink()
+        except OSError:
+            pass
@@ -6,20 +6,65 @@ Extracts problem description, acceptance criteria, and linked PRs from Jira tick
 
 import re
 import os
-from typing import Dict, List, Optional, Tuple
+import hashlib
+from itertools import chain
+from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from jira import JIRA
+from jira.exceptions import JIRAError
+from requests.cookies import RequestsCookieJar, create_cookie
 import logging
 
+from disk_cache import DiskCache
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Cached ticket data is keyed on the issue's 'updated' timestamp, so the TTL
+# only bounds how long entries for unchanged tickets linger on disk.
+JIRA_CACHE_TTL_SECONDS = 8 * 60 * 60
+JIRA_SESSION_TTL_SECONDS = 8 * 60 * 60
+
+# Tickets that returned 403/404 are not retried for this long
+JIRA_MISSING_TTL_SECONDS = 5 * 60
+
+# Fields requested for a ticket; 'comment' embeds the comments in the same response
+_ISSUE_FIELDS = "summary,description,status,priority,issuetype,issuelinks,comment,updated"
+
+# Authenticated clients shared by every parser in the process, keyed on
+# (server, username, sha256(token)) so the token itself is never a key.
+_JIRA_CLIENTS: Dict[Tuple[str, str, str], JIRA] = {}
+
+# Jira ticket keys (PROJECT-123 format) and GitHub PR URLs
+_KEY_RE = re.compile(r'([A-Z]+-\d+)')
+_PR_URL_RE = re.compile(r'https://github\.com/[\w\-\.]+/[\w\-\.]+/pull/\d+')
+
+# Every acceptance criteria section heading below contains one of these words
+_AC_KEYWORDS = frozenset(("acceptance", "criteria", "done", "requirement", "success"))
+
+# Common patterns for acceptance criteria sections, in priority order
+_AC_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in (
+    r'acceptance\s+criteria:?\s*(.*?)(?=\n\n|\n[A-Z]|$)',
+    r'definition\s+of\s+done:?\s*(.*?)(?=\n\n|\n[A-Z]|$)',
+    r'success\s+criteria:?\s*(.*?)(?=\n\n|\n[A-Z]|$)',
+    r'requirements:?\s*(.*?)(?=\n\n|\n[A-Z]|$)',
+))
+
+# Characters that start a bullet item, including Jira wiki ordered lists (#, ##)
+_BULLET_MARKERS = "*-+#"
+
+# Bullet point and numbered list items
+_BULLET_PATTERNS = (
+    re.compile(r'\n[\s]*[\*\-\+]\s+(.+?)(?=\n|$)'),
+    re.compile(r'\n[\s]*\d+[\.)\s]+(.+?)(?=\n|$)'),
+)
+
 @dataclass
 class JiraTicketInfo:
     """Structured representation of extracted Jira ticket information."""
     ticket_key: str
     problem_description: str
-    acceptance_criteria: List[str]
+    acceptance_criteria: Tuple[str, ...]
     linked_prs: List[str]
     summary: str
     status: str
@@ -29,25 +74,85 @@ class JiraTicketInfo:
 class JiraParser:
     """Handles Jira API integration and ticket parsing."""
     
-    def __init__(self, server: str, username: str, token: str):
-        """Initialize Jira client with credentials."""
+    def __init__(self, server: str, username: str, token: str,
+                 use_cache: bool = True, refresh_cache: bool = False, max_prs: int = 10):
+        """
+        Initialize Jira client with credentials.
+        
+        Args:
+            server: Jira server URL
+            username: Jira username
+            token: Jira API token
+            use_cache: Read and write the on-disk ticket cache
+            refresh_cache: Ignore cached tickets but store freshly fetched ones
+            max_prs: Maximum number of linked PR URLs to collect per ticket
+        """
         self.server = server
         self.username = username
         self.token = token
-        self.jira = None
-        self._connect()
+        self.max_prs = max_prs
+        self._jira = None
+        self.cache = DiskCache("jira", JIRA_CACHE_TTL_SECONDS, enabled=use_cache, refresh=refresh_cache)
+        self.missing_cache = DiskCache("jira-missing", JIRA_MISSING_TTL_SECONDS,
+                                       enabled=use_cache, refresh=refresh_cache)
+        self.session_cache = DiskCache("session", JIRA_SESSION_TTL_SECONDS, enabled=use_cache)
+    
+    @property
+    def jira(self) -> JIRA:
+        """Jira client, connected on first use."""
+        if self._jira is None:
+            self._connect()
+        return self._jira
     
     def _connect(self):
-        """Establish connection to Jira."""
-        try:
-            self.jira = JIRA(
-                server=self.server,
-                basic_auth=(self.username, self.token)
-            )
-            logger.info(f"Connected to Jira server: {self.server}")
-        except Exception as e:
-            logger.error(f"Failed to connect to Jira: {e}")
-            raise
+        """Establish connection to Jira, reusing an existing client when possible."""
+        token_hash = hashlib.sha256(self.token.encode("utf-8")).hexdigest()
+        client_key = (self.server, self.username, token_hash)
+        
+        client = _JIRA_CLIENTS.get(client_key)
+        if client is None:
+            session_key = "|".join(client_key)
+            try:
+                # Saved cookies are loaded into the session before JIRA's first request,
+                # so the handshake already runs in the earlier session
+                client = JIRA(
+                    server=self.server,
+                    basic_auth=(self.username, self.token),
+                    options={"cookies": self._load_session_cookies(session_key)}
+                )
+                logger.info(f"Connected to Jira server: {self.server}")
+            except Exception as e:
+                logger.error(f"Failed to connect to Jira: {e}")
+                raise
+            
+            self._save_session_cookies(client, session_key)
+            _JIRA_CLIENTS[client_key] = client
+        
+        self._jira = client
+    
+    def _load_session_cookies(self, session_key: str) -> RequestsCookieJar:
+        """Rebuild the session cookies saved by a recent run, keeping their domain and path."""
+        jar = RequestsCookieJar()
+        for cookie in self.session_cache.get(session_key) or []:
+            jar.set_cookie(create_cookie(**cookie))
+        
+        if len(jar):
+            logger.debug("Reusing saved Jira session cookies")
+        return jar
+    
+    def _save_session_cookies(self, client: JIRA, session_key: str):
+        """Save the client's session cookies with the attributes needed to send them again."""
+        self.session_cache.set(session_key, [
+            {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "secure": cookie.secure,
+                "expires": cookie.expires
+            }
+            for cookie in client._session.cookies
+        ])
     
     def extract_ticket_info(self, ticket_url_or_key: str) -> JiraTicketInfo:
         """
@@ -63,41 +168,155 @@ class JiraParser:
         ticket_key = self._extract_ticket_key(ticket_url_or_key)
         
         try:
-            issue = self.jira.issue(ticket_key)
-            
-            # Extract basic info
-            summary = issue.fields.summary
-            description = issue.fields.description or ""
-            status = issue.fields.status.name
-            priority = issue.fields.priority.name if issue.fields.priority else "Unknown"
-            issue_type = issue.fields.issuetype.name
+            fields = self._get_issue_fields(ticket_key)
+            description = fields["description"]
             
             # Extract problem description and acceptance criteria
             problem_description, acceptance_criteria = self._parse_description(description)
             
             # Find linked PRs
-            linked_prs = self._find_linked_prs(issue)
+            linked_prs = self._find_linked_prs(fields, description)
             
             return JiraTicketInfo(
                 ticket_key=ticket_key,
                 problem_description=problem_description,
-                acceptance_criteria=acceptance_criteria,
+                acceptance_criteria=tuple(acceptance_criteria),
                 linked_prs=linked_prs,
-                summary=summary,
-                status=status,
-                priority=priority,
-                issue_type=issue_type
+                summary=fields["summary"],
+                status=fields["status"],
+                priority=fields["priority"],
+                issue_type=fields["issue_type"]
             )
             
         except Exception as e:
             logger.error(f"Failed to extract ticket info for {ticket_key}: {e}")
             raise
     
+    def _get_issue_fields(self, ticket_key: str) -> Dict[str, Any]:
+        """
+        Get the field projection for a ticket, remembering tickets that don't exist.
+        
+        A ticket that returned 403 or 404 re-raises the recorded error without
+        an HTTP call until the short negative-cache TTL expires.
+        
+        Args:
+            ticket_key: Jira ticket key
+            
+        Returns:
+            Dictionary of ticket fields (see _project_issue_fields)
+        """
+        missing_key = f"{self.server}|{self.username}|{ticket_key}"
+        missing = self.missing_cache.get(missing_key)
+        if missing is not None:
+            logger.info(f"Skipping {ticket_key}: Jira returned {missing['status_code']} recently")
+            raise JIRAError(text=missing["text"], status_code=missing["status_code"])
+        
+        try:
+            return self._fetch_issue_fields(ticket_key)
+        except JIRAError as e:
+            if e.status_code in (403, 404):
+                self.missing_cache.set(missing_key, {"status_code": e.status_code, "text": e.text})
+            raise
+    
+    def _fetch_issue_fields(self, ticket_key: str) -> Dict[str, Any]:
+        """
+        Fetch the field projection for a ticket, using the disk cache when possible.
+        
+        Only the ticket's 'updated' timestamp is fetched to validate a cached
+        entry; the full issue and its comments are fetched on a miss.
+        
+        Args:
+            ticket_key: Jira ticket key
+            
+        Returns:
+            Dictionary of ticket fields (see _project_issue_fields)
+        """
+        if self.cache.enabled and not self.cache.refresh:
+            updated = self.jira.issue(ticket_key, fields="updated").raw['fields']['updated']
+            fields = self.cache.get(self._cache_key(ticket_key, updated))
+            if fields is not None:
+                logger.info(f"Using cached Jira data for {ticket_key}")
+                return fields
+        
+        issue = self.jira.issue(ticket_key, fields=_ISSUE_FIELDS)
+        fields = self._project_issue_fields(issue)
+        
+        # Don't persist a projection with missing comments
+        if fields["comment_bodies"] is not None:
+            self.cache.set(self._cache_key(ticket_key, fields["updated"]), fields)
+        
+        return fields
+    
+    def _cache_key(self, ticket_key: str, updated: str) -> str:
+        """Build the cache key for a ticket revision."""
+        return f"{self.server}|{self.username}|{ticket_key}|{updated}"
+    
+    def _project_issue_fields(self, issue) -> Dict[str, Any]:
+        """
+        Reduce a Jira issue to the JSON-serializable fields used for parsing.
+        
+        Reads the raw REST response directly rather than going through the
+        issue's attribute proxies.
+        
+        Args:
+            issue: Jira issue object
+            
+        Returns:
+            Dictionary with summary, description, status, priority, issue type,
+            updated timestamp, linked issue summaries and comment bodies
+            (None if comments could not be fetched)
+        """
+        raw = issue.raw['fields']
+        link_summaries = []
+        
+        # Check both inward and outward links
+        for link in raw.get('issuelinks') or []:
+            linked_issue = link.get('inwardIssue') or link.get('outwardIssue')
+            if linked_issue:
+                link_summaries.append(linked_issue['fields']['summary'])
+        
+        comment_bodies = self._get_comment_bodies(issue, raw)
+        
+        return {
+            "summary": raw['summary'],
+            "description": raw.get('description') or "",
+            "status": raw['status']['name'],
+            "priority": (raw.get('priority') or {}).get('name', "Unknown"),
+            "issue_type": raw['issuetype']['name'],
+            "updated": raw['updated'],
+            "link_summaries": link_summaries,
+            "comment_bodies": comment_bodies
+        }
+    
+    def _get_comment_bodies(self, issue, raw: Dict[str, Any]) -> Optional[List[str]]:
+        """
+        Get comment bodies from the issue's embedded comment field.
+        
+        Falls back to a separate comments request only when the field is
+        missing or holds just the first page of comments.
+        
+        Args:
+            issue: Jira issue object
+            raw: Raw 'fields' dictionary of the issue
+            
+        Returns:
+            List of comment bodies, or None if comments could not be fetched
+        """
+        comment_field = raw.get('comment')
+        if comment_field is not None:
+            comments = comment_field.get('comments', [])
+            if comment_field.get('total', len(comments)) <= len(comments):
+                return [comment['body'] for comment in comments]
+        
+        try:
+            return [comment.body for comment in self.jira.comments(issue)]
+        except Exception as e:
+            logger.warning(f"Could not fetch comments: {e}")
+            return None
+    
     def _extract_ticket_key(self, ticket_url_or_key: str) -> str:
         """Extract ticket key from URL or return as-is if already a key."""
-        # Pattern to match Jira ticket keys (PROJECT-123 format)
-        key_pattern = r'([A-Z]+-\d+)'
-        match = re.search(key_pattern, ticket_url_or_key)
+        match = _KEY_RE.search(ticket_url_or_key)
         
         if match:
             return match.group(1)
@@ -117,96 +336,111 @@ class JiraParser:
         if not description:
             return "No description provided", []
         
-        # Common patterns for acceptance criteria sections
-        ac_patterns = [
-            r'(?i)acceptance\s+criteria:?\s*(.*?)(?=\n\n|\n[A-Z]|$)',
-            r'(?i)definition\s+of\s+done:?\s*(.*?)(?=\n\n|\n[A-Z]|$)',
-            r'(?i)success\s+criteria:?\s*(.*?)(?=\n\n|\n[A-Z]|$)',
-            r'(?i)requirements:?\s*(.*?)(?=\n\n|\n[A-Z]|$)',
-        ]
-        
         acceptance_criteria = []
         problem_description = description
         
-        # Try to find acceptance criteria
-        for pattern in ac_patterns:
-            match = re.search(pattern, description, re.DOTALL)
-            if match:
-                ac_text = match.group(1).strip()
-                # Split by bullet points or numbered lists
-                criteria_items = re.split(r'\n[\s]*[\*\-\+\d+\.]\s*', ac_text)
-                acceptance_criteria = [item.strip() for item in criteria_items if item.strip()]
-                
-                # Remove AC section from problem description
-                problem_description = description[:match.start()].strip()
-                break
+        # Try to find acceptance criteria (only if a section keyword appears at all)
+        description_lower = description.lower()
+        if any(keyword in description_lower for keyword in _AC_KEYWORDS):
+            for pattern in _AC_PATTERNS:
+                match = pattern.search(description)
+                if match:
+                    ac_text = match.group(1).strip()
+                    # Split by bullet points or numbered lists
+                    acceptance_criteria = self._split_criteria(ac_text)
+                    
+                    # Remove AC section from problem description
+                    problem_description = description[:match.start()].strip()
+                    break
         
         # Look for bullet points or numbered lists anywhere in description if no explicit AC section
-        if not acceptance_criteria:
-            bullet_patterns = [
-                r'\n[\s]*[\*\-\+]\s+(.+?)(?=\n|$)',
-                r'\n[\s]*\d+[\.)\s]+(.+?)(?=\n|$)',
-            ]
-            
-            for pattern in bullet_patterns:
-                matches = re.findall(pattern, description)
+        # (list items always follow a line break)
+        if not acceptance_criteria and "\n" in description:
+            for pattern in _BULLET_PATTERNS:
+                matches = pattern.findall(description)
                 if len(matches) >= 2:  # At least 2 items suggest it's a list
                     acceptance_criteria = [match.strip() for match in matches]
                     break
         
         return problem_description, acceptance_criteria
     
-    def _find_linked_prs(self, issue) -> List[str]:
+    def _split_criteria(self, ac_text: str) -> List[str]:
+        """
+        Split an acceptance criteria section into individual items.
+        
+        Lines starting with a bullet (*, -, +), a Jira wiki list marker (#, ##)
+        or a number (1. or 1)) start a new item; other lines continue the
+        previous item.
+        
+        Args:
+            ac_text: Text of the acceptance criteria section
+            
+        Returns:
+            List of criteria with list markers removed
+        """
+        items = []
+        
+        for line in ac_text.splitlines():
+            text = line.strip()
+            if not text:
+                continue
+            
+            marker_length = self._list_marker_length(text)
+            if marker_length or not items:
+                item = text[marker_length:].strip()
+                if item:
+                    items.append(item)
+            else:
+                items[-1] = f"{items[-1]}\n{text}"
+        
+        return items
+    
+    def _list_marker_length(self, text: str) -> int:
+        """Return the length of a leading list marker in text, or 0 if none."""
+        if text[0] in _BULLET_MARKERS:
+            return len(text) - len(text.lstrip(_BULLET_MARKERS))
+        
+        if text[0].isdigit():
+            digits = len(text) - len(text.lstrip("0123456789"))
+            if digits < len(text) and text[digits] in ".)":
+                return digits + 1
+        
+        return 0
+    
+    def _find_linked_prs(self, fields: Dict[str, Any], description: str) -> List[str]:
         """
         Find linked pull requests in the issue.
         
         Args:
-            issue: Jira issue object
+            fields: Ticket field projection from _get_issue_fields
+            description: Ticket description text
             
         Returns:
-            List of PR URLs
-        """
-        linked_prs = []
-        
-        # Check issue links for PR references
-        if hasattr(issue.fields, 'issuelinks'):
-            for link in issue.fields.issuelinks:
-                # Check both inward and outward links
-                linked_issue = getattr(link, 'inwardIssue', None) or getattr(link, 'outwardIssue', None)
-                if linked_issue:
-                    summary = linked_issue.fields.summary
-                    # Look for PR patterns in linked issue summaries
-                    pr_urls = self._extract_pr_urls_from_text(summary)
-                    linked_prs.extend(pr_urls)
-        
-        # Check comments for PR references
-        try:
-            comments = self.jira.comments(issue)
-            for comment in comments:
-                pr_urls = self._extract_pr_urls_from_text(comment.body)
-                linked_prs.extend(pr_urls)
-        except Exception as e:
-            logger.warning(f"Could not fetch comments: {e}")
+            List of unique PR URLs in order of first appearance, at most max_prs
+        """
+        # Linked issue summaries, then comments, then the description
+        texts = chain(fields["link_summaries"], fields["comment_bodies"] or [], (description,))
+        pr_urls = chain.from_iterable(map(self._extract_pr_urls_from_text, texts))
         
-        # Check description for PR references
-        description = issue.fields.description or ""
-        pr_urls = self._extract_pr_urls_from_text(description)
-        linked_prs.extend(pr_urls)
+        # Insertion-ordered dict keeps the result stable across runs; texts are
+        # scanned lazily, so scanning stops as soon as max_prs URLs are seen
+        seen: Dict[str, None] = {}
+        for pr_url in pr_urls:
+            if len(seen) >= self.max_prs:
+                break
+            seen[pr_url] = None
         
-        return list(set(linked_prs))  # Remove duplicates
+        return list(seen)
     
     def _extract_pr_urls_from_text(self, text: str) -> List[str]:
         """Extract GitHub PR URLs from text."""
         if not text:
             return []
         
-        # Pattern to match GitHub PR URLs
-        pr_pattern = r'https://github\.com/[\w\-\.]+/[\w\-\.]+/pull/\d+'
-        matches = re.findall(pr_pattern, text)
-        
-        return matches
+        return _PR_URL_RE.findall(text)
 
-def create_jira_parser() -> JiraParser:
+def create_jira_parser(use_cache: bool = True, refresh_cache: bool = False,
+                       max_prs: int = 10) -> JiraParser:
     """Factory function to create JiraParser with environment variables."""
     server = os.getenv('JIRA_SERVER', 'https://your-company.atlassian.net')
     username = os.getenv('JIRA_USERNAME')
@@ -215,4 +449,5 @@ def create_jira_parser() -> JiraParser:
     if not username or not token:
         raise ValueError("JIRA_USERNAME and JIRA_TOKEN environment variables must be set")
     
-    return JiraParser(server, username, token) 
\ No newline at end of file
+    return JiraParser(server, username, token, use_cache=use_cache,
+                      refresh_cache=refresh_cache, max_prs=max_prs) 
\ No newline at end of file
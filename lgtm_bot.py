@@ -6,20 +6,23 @@ Main entry point for the LGTM bot that reviews PRs against Jira ticket requireme
 """
 
 import os
+import re
 import sys
+import textwrap
+from contextlib import nullcontext
 import click
 import yaml
 import logging
-from typing import Optional, List, Dict, Any
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Tuple
 
-from jira_parser import create_jira_parser, JiraTicketInfo
-from pr_analyzer import create_pr_analyzer, PRDiff
-from review_engine import create_review_engine, ReviewResult, ReviewStatus
-from output_formatter import OutputFormatter
-
-# Load environment variables
-load_dotenv()
+# The Jira, GitHub and AI provider SDKs are imported where they are needed so
+# that --help and single-purpose subcommands don't pay for all of them.
+if TYPE_CHECKING:
+    from jira_parser import JiraTicketInfo
+    from pr_analyzer import PRAnalyzer, PRDiff
+    from review_engine import ReviewEngine, ReviewResult
 
 # Configure logging
 logging.basicConfig(
@@ -28,25 +31,57 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Use the LibYAML C parser when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Parsed config files keyed on absolute path, with the mtime they were parsed at
+_CONFIG_CACHE: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+
+# Upper bound on PRs fetched and reviewed at the same time
+MAX_PARALLEL_PR_REVIEWS = 4
+
+def _load_environment():
+    """Load environment variables from a .env file."""
+    from dotenv import load_dotenv
+    
+    load_dotenv()
+
 class LGTMBot:
     """Main LGTM Bot class that orchestrates the review process."""
     
-    def __init__(self, config_file: str = "config.yaml"):
+    def __init__(self, config_file: str = "config.yaml", use_cache: bool = True,
+                 refresh_cache: bool = False):
         """
         Initialize the LGTM bot with configuration.
         
         Args:
             config_file: Path to configuration file
+            use_cache: Use the on-disk cache for API responses
+            refresh_cache: Ignore cached responses but refresh the cache
         """
+        from output_formatter import OutputFormatter
+        
+        _load_environment()
         self.config = self._load_config(config_file)
+        self.use_cache = use_cache
+        self.refresh_cache = refresh_cache
         self.formatter = OutputFormatter()
         self._validate_environment()
     
     def _load_config(self, config_file: str) -> Dict[str, Any]:
-        """Load configuration from YAML file."""
+        """Load configuration from YAML file, reusing the parsed result if unchanged."""
         try:
-            with open(config_file, 'r') as f:
-                config = yaml.safe_load(f)
+            path = os.path.abspath(config_file)
+            mtime_ns = os.stat(path).st_mtime_ns
+            
+            cached = _CONFIG_CACHE.get(path)
+            if cached and cached[0] == mtime_ns:
+                config = cached[1]
+            else:
+                with open(path, 'r') as f:
+                    config = yaml.load(f, Loader=_YAML_LOADER)
+                _CONFIG_CACHE[path] = (mtime_ns, config)
+            
             logger.info(f"Loaded configuration from {config_file}")
             return config
         except FileNotFoundError:
@@ -60,12 +95,15 @@ class LGTMBot:
         """Get default configuration."""
         return {
             "jira": {
-                "server": "https://your-company.atlassian.net"
+                "server": "https://your-company.atlassian.net",
+                "max_linked_prs": 10
             },
             "ai": {
                 "provider": "anthropic",
                 "model": "claude-3-sonnet-20240229",
-                "base_url": None
+                "base_url": None,
+                "separate_code_review": False,
+                "fast_fail": False
             },
             "review": {
                 "criteria": [
@@ -108,25 +146,33 @@ class LGTMBot:
             sys.exit(1)
     
     def review_pr(self, jira_ticket: str, pr_urls: List[str] = None, 
-                  output_format: str = "console", save_to: Optional[str] = None) -> ReviewResult:
+                  output_format: str = "console", save_to: Optional[str] = None) -> "ReviewResult":
         """
         Perform complete PR review against Jira ticket.
         
         Args:
             jira_ticket: Jira ticket URL or key
-            pr_urls: List of PR URLs (if not provided, will look for linked PRs)
+            pr_urls: List of PR URLs (if not provided, will look for linked PRs);
+                each PR is reviewed separately and all are output in one document
             output_format: Output format ("console", "markdown", "json")
             save_to: File path to save output (optional)
             
         Returns:
-            Review result
+            Review result, combined across PRs when more than one is reviewed
         """
+        from jira_parser import create_jira_parser
+        from review_engine import create_review_engine
+        
         logger.info(f"Starting review for ticket: {jira_ticket}")
         
         try:
             # Step 1: Extract Jira ticket information
             logger.info("Step 1: Extracting Jira ticket information...")
-            jira_parser = create_jira_parser()
+            jira_parser = create_jira_parser(
+                use_cache=self.use_cache,
+                refresh_cache=self.refresh_cache,
+                max_prs=self.config.get("jira", {}).get("max_linked_prs", 10)
+            )
             ticket_info = jira_parser.extract_ticket_info(jira_ticket)
             
             logger.info(f"Found ticket: {ticket_info.ticket_key} - {ticket_info.summary}")
@@ -142,76 +188,202 @@ class LGTMBot:
                     logger.info("Please provide PR URLs using --pr-url option")
                     sys.exit(1)
             
-            # For now, review the first PR (could be extended to handle multiple)
-            pr_url = pr_urls[0]
-            logger.info(f"Reviewing PR: {pr_url}")
-            
-            # Step 2: Analyze PR diff
-            logger.info("Step 2: Analyzing PR diff...")
-            pr_analyzer = create_pr_analyzer(self.config["review"]["test_patterns"])
-            pr_diff = pr_analyzer.get_pr_diff(pr_url)
-            
-            logger.info(f"PR #{pr_diff.pr_number}: {pr_diff.title}")
-            logger.info(f"Files changed: {pr_diff.total_files_changed}")
-            logger.info(f"Lines: +{pr_diff.total_additions}, -{pr_diff.total_deletions}")
-            
-            # Step 3: Perform code quality analysis
-            logger.info("Step 3: Performing code quality analysis...")
-            code_quality_analysis = pr_analyzer.analyze_code_quality(
-                pr_diff, self.config["review"]["fail_keywords"]
-            )
-            
-            # Step 4: Run AI-powered review
-            logger.info("Step 4: Running AI-powered review...")
             ai_config = self.config["ai"]
             review_engine = create_review_engine(
                 provider=ai_config["provider"],
                 model=ai_config.get("model"),
-                base_url=ai_config.get("base_url")
+                base_url=ai_config.get("base_url"),
+                use_cache=self.use_cache,
+                refresh_cache=self.refresh_cache,
+                separate_code_review=ai_config.get("separate_code_review", False),
+                fast_fail=ai_config.get("fast_fail", False)
             )
             
-            review_result = review_engine.review_pr(
-                ticket_info, pr_diff, code_quality_analysis
-            )
-            
-            logger.info(f"Review completed - Status: {review_result.status.value}")
-            logger.info(f"Overall score: {review_result.overall_score:.1%}")
+            # Steps 2-4 are network-bound and independent per PR, so run them concurrently;
+            # with several PRs, one that cannot be reviewed yields a FAIL result instead of
+            # aborting the others
+            isolate_errors = len(pr_urls) > 1
+            with review_engine, ThreadPoolExecutor(max_workers=min(len(pr_urls), MAX_PARALLEL_PR_REVIEWS)) as executor:
+                reviews = list(executor.map(
+                    lambda url: self._review_single_pr(url, ticket_info, review_engine, isolate_errors),
+                    pr_urls
+                ))
             
-            # Step 5: Format and display results
-            self._output_results(ticket_info, pr_diff, review_result, output_format, save_to)
+            # Step 5: Format and display results, all stamped with the same review time
+            self._output_results(ticket_info, reviews, output_format, save_to, datetime.now())
             
-            return review_result
+            if len(reviews) == 1:
+                return reviews[0][1]
+            return self._combine_results(reviews)
             
         except Exception as e:
             logger.error(f"Review failed: {e}")
             raise
     
-    def _output_results(self, ticket_info: JiraTicketInfo, pr_diff: PRDiff, 
-                       review_result: ReviewResult, output_format: str, save_to: Optional[str]):
-        """Output review results in the specified format."""
+    def _review_single_pr(self, pr_url: str, ticket_info: "JiraTicketInfo", review_engine: "ReviewEngine",
+                          isolate_errors: bool = False) -> Tuple["PRDiff", "ReviewResult"]:
+        """
+        Fetch, analyze and review one PR against the ticket.
+        
+        Args:
+            pr_url: GitHub PR URL
+            ticket_info: Jira ticket information
+            review_engine: Shared review engine
+            isolate_errors: Return a FAIL result describing the error, instead of
+                raising, if the PR could not be reviewed
+            
+        Returns:
+            Tuple of (pr_diff, review_result)
+        """
+        from pr_analyzer import create_pr_analyzer
+        
+        logger.info(f"Reviewing PR: {pr_url}")
+        
+        try:
+            # PyGithub's client is not safe to share between threads, so each PR gets its own
+            pr_analyzer = create_pr_analyzer(
+                self.config["review"]["test_patterns"],
+                use_cache=self.use_cache,
+                refresh_cache=self.refresh_cache
+            )
+            return self._analyze_and_review(pr_url, ticket_info, pr_analyzer, review_engine)
+        except Exception as e:
+            if not isolate_errors:
+                raise
+            logger.error(f"Review of {pr_url} failed: {e}")
+            return self._failed_review(pr_url, e)
+    
+    def _analyze_and_review(self, pr_url: str, ticket_info: "JiraTicketInfo", pr_analyzer: "PRAnalyzer",
+                            review_engine: "ReviewEngine") -> Tuple["PRDiff", "ReviewResult"]:
+        """Run steps 2-4 for one PR."""
+        # Step 2: Analyze PR diff
+        logger.info("Step 2: Analyzing PR diff...")
+        pr_diff = pr_analyzer.get_pr_diff(pr_url)
+        
+        logger.info(f"PR #{pr_diff.pr_number}: {pr_diff.title}")
+        logger.info(f"Files changed: {pr_diff.total_files_changed}")
+        logger.info(f"Lines: +{pr_diff.total_additions}, -{pr_diff.total_deletions}")
+        
+        # Step 3: Perform code quality analysis
+        logger.info("Step 3: Performing code quality analysis...")
+        code_quality_analysis = pr_analyzer.analyze_code_quality(
+            pr_diff, self.config["review"]["fail_keywords"]
+        )
+        
+        # Step 4: Run AI-powered review
+        logger.info("Step 4: Running AI-powered review...")
+        review_result = review_engine.review_pr(
+            ticket_info, pr_diff, code_quality_analysis
+        )
+        
+        logger.info(f"PR #{pr_diff.pr_number} review completed - Status: {review_result.status.value}")
+        logger.info(f"Overall score: {review_result.overall_score:.1%}")
+        
+        return pr_diff, review_result
+    
+    def _failed_review(self, pr_url: str, error: Exception) -> Tuple["PRDiff", "ReviewResult"]:
+        """Build a placeholder diff and FAIL result for a PR whose review raised an error."""
+        from pr_analyzer import PRDiff
+        from review_engine import ReviewResult, ReviewStatus
+        
+        match = re.search(r"/pull/(\d+)", pr_url)
+        pr_diff = PRDiff(
+            pr_number=int(match.group(1)) if match else 0,
+            title=pr_url,
+            description="",
+            author="",
+            state="",
+            file_changes=[],
+            total_additions=0,
+            total_deletions=0,
+            total_files_changed=0,
+            base_branch="",
+            head_branch="",
+            created_at="",
+            updated_at=""
+        )
+        review_result = ReviewResult(
+            status=ReviewStatus.FAIL,
+            overall_score=0.0,
+            lgtm_comment=None,
+            summary=f"**Review Status:** FAIL\n**Error:** Could not review {pr_url}: {error}",
+            acceptance_criteria_analysis=[],
+            code_quality_issues=[],
+            test_analysis={},
+            suggestions=[],
+            required_changes=[f"Resolve review error: {error}"],
+            recommended_tests=[]
+        )
+        return pr_diff, review_result
+    
+    def _combine_results(self, reviews: List[Tuple["PRDiff", "ReviewResult"]]) -> "ReviewResult":
+        """
+        Combine per-PR review results into one overall result.
+        
+        The combined status is the worst individual status and the score is
+        the lowest individual score.
+        
+        Args:
+            reviews: List of (pr_diff, review_result) tuples
+            
+        Returns:
+            Combined review result
+        """
+        from review_engine import ReviewResult, ReviewStatus
+        
+        severity = [ReviewStatus.PASS, ReviewStatus.CONDITIONAL, ReviewStatus.FAIL]
+        results = [review_result for _, review_result in reviews]
+        status = max((r.status for r in results), key=severity.index)
+        
+        return ReviewResult(
+            status=status,
+            overall_score=min(r.overall_score for r in results),
+            lgtm_comment=results[0].lgtm_comment if status == ReviewStatus.PASS else None,
+            summary="\n\n".join(f"**PR #{pr_diff.pr_number}:**\n{r.summary}" for pr_diff, r in reviews),
+            acceptance_criteria_analysis=[ac for r in results for ac in r.acceptance_criteria_analysis],
+            code_quality_issues=[issue for r in results for issue in r.code_quality_issues],
+            test_analysis={f"#{pr_diff.pr_number}": r.test_analysis for pr_diff, r in reviews},
+            suggestions=[suggestion for r in results for suggestion in r.suggestions],
+            required_changes=[change for r in results for change in r.required_changes],
+            recommended_tests=[test for r in results for test in r.recommended_tests]
+        )
+    
+    def _output_results(self, ticket_info: "JiraTicketInfo", reviews: List[Tuple["PRDiff", "ReviewResult"]],
+                       output_format: str, save_to: Optional[str], review_timestamp: Optional[datetime] = None):
+        """
+        Output review results in the specified format.
+        
+        Several PRs go into one document: markdown reports separated by rules,
+        or a JSON array with one object per PR.
+        """
         if output_format == "console":
-            self.formatter.format_console_output(ticket_info, pr_diff, review_result)
+            for pr_diff, review_result in reviews:
+                self.formatter.format_console_output(ticket_info, pr_diff, review_result)
+            return
         
-        elif output_format == "markdown":
-            markdown_output = self.formatter.format_markdown_output(ticket_info, pr_diff, review_result)
-            if save_to:
-                with open(save_to, 'w') as f:
-                    f.write(markdown_output)
-                logger.info(f"Markdown output saved to {save_to}")
-            else:
-                print(markdown_output)
+        if output_format not in ("markdown", "json"):
+            logger.error(f"Unknown output format: {output_format}")
+            return
         
-        elif output_format == "json":
-            json_output = self.formatter.format_json_output(ticket_info, pr_diff, review_result)
-            if save_to:
-                with open(save_to, 'w') as f:
-                    f.write(json_output)
-                logger.info(f"JSON output saved to {save_to}")
+        with open(save_to, 'w') if save_to else nullcontext(sys.stdout) as out:
+            if output_format == "markdown":
+                for n, (pr_diff, review_result) in enumerate(reviews):
+                    if n:
+                        out.write("\n\n---\n\n")
+                    self.formatter.format_markdown_output(ticket_info, pr_diff, review_result, out=out,
+                                                          review_timestamp=review_timestamp)
+            elif len(reviews) == 1:
+                pr_diff, review_result = reviews[0]
+                self.formatter.format_json_output(ticket_info, pr_diff, review_result, out=out,
+                                                  review_timestamp=review_timestamp)
             else:
-                print(json_output)
+                self.formatter.format_json_reviews(ticket_info, reviews, out=out, review_timestamp=review_timestamp)
+            
+            if not save_to:
+                out.write("\n")
         
-        else:
-            logger.error(f"Unknown output format: {output_format}")
+        if save_to:
+            logger.info(f"{'Markdown' if output_format == 'markdown' else 'JSON'} output saved to {save_to}")
 
 # CLI Interface
 @click.command()
@@ -223,8 +395,10 @@ class LGTMBot:
 @click.option('--save-to', '-s', help='Save output to file')
 @click.option('--config', '-c', default='config.yaml', help='Configuration file path')
 @click.option('--verbose', '-v', is_flag=True, help='Enable verbose logging')
+@click.option('--no-cache', is_flag=True, help='Do not read or write the on-disk API cache')
+@click.option('--refresh-cache', is_flag=True, help='Ignore cached API responses and refresh them')
 def main(jira_ticket: str, pr_url: tuple, output: str, save_to: Optional[str], 
-         config: str, verbose: bool):
+         config: str, verbose: bool, no_cache: bool, refresh_cache: bool):
     """
     LGTM Bot - AI-Powered Code Review Bot
     
@@ -251,11 +425,13 @@ def main(jira_ticket: str, pr_url: tuple, output: str, save_to: Optional[str],
     lgtm-bot PROJ-123 --output json --save-to review.json
     """
     
+    from review_engine import ReviewStatus
+    
     if verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
     try:
-        bot = LGTMBot(config)
+        bot = LGTMBot(config, use_cache=not no_cache, refresh_cache=refresh_cache)
         pr_urls = list(pr_url) if pr_url else None
         
         review_result = bot.review_pr(
@@ -287,12 +463,14 @@ def main(jira_ticket: str, pr_url: tuple, output: str, save_to: Optional[str],
 @click.group()
 def cli():
     """LGTM Bot CLI - AI-Powered Code Review"""
-    pass
+    _load_environment()
 
 @cli.command()
 @click.argument('ticket')
 def analyze_ticket(ticket: str):
     """Analyze a Jira ticket and extract information."""
+    from jira_parser import create_jira_parser
+    
     try:
         jira_parser = create_jira_parser()
         ticket_info = jira_parser.extract_ticket_info(ticket)
@@ -319,6 +497,8 @@ def analyze_ticket(ticket: str):
 @click.argument('pr_url')
 def analyze_pr(pr_url: str):
     """Analyze a GitHub PR and show diff information."""
+    from pr_analyzer import create_pr_analyzer
+    
     try:
         pr_analyzer = create_pr_analyzer()
         pr_diff = pr_analyzer.get_pr_diff(pr_url)
@@ -330,7 +510,7 @@ def analyze_pr(pr_url: str):
         print(f"Files changed: {pr_diff.total_files_changed}")
         print(f"Changes: +{pr_diff.total_additions}, -{pr_diff.total_deletions}")
         print(f"\nDescription:")
-        print(pr_diff.description[:200] + "..." if len(pr_diff.description) > 200 else pr_diff.description)
+        print(textwrap.shorten(pr_diff.description or "", width=200, placeholder="..."))
         
         print(f"\nFiles:")
         for file_change in pr_diff.file_changes:
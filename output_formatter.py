@@ -4,25 +4,48 @@ Output Formatter Module
 Formats review results for different output types (console, markdown, JSON).
 """
 
+import io
 import json
-from typing import Dict, List, Any
+from functools import cached_property
+from typing import Dict, List, Any, Optional, TextIO, Tuple
+from dataclasses import asdict
 from datetime import datetime
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.text import Text
-from rich.markdown import Markdown
 
-from review_engine import ReviewResult, ReviewStatus
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+from review_engine import CriterionAnalysis, ReviewResult, ReviewStatus
 from jira_parser import JiraTicketInfo
 from pr_analyzer import PRDiff
 
+# Per-status badge emoji (markdown) and text colors (console)
+_STATUS_EMOJI = {
+    ReviewStatus.PASS: "✅",
+    ReviewStatus.CONDITIONAL: "⚠️",
+    ReviewStatus.FAIL: "❌"
+}
+
+_STATUS_COLORS = {
+    ReviewStatus.PASS: "green",
+    ReviewStatus.CONDITIONAL: "yellow",
+    ReviewStatus.FAIL: "red"
+}
+
+def _bullets(items: List[Any]) -> str:
+    """Render items as newline-terminated markdown bullets."""
+    return "".join([f"- {item}\n" for item in items])
+
 class OutputFormatter:
     """Handles formatting of review results for different output types."""
     
-    def __init__(self):
-        """Initialize the formatter."""
-        self.console = Console()
+    @cached_property
+    def console(self):
+        """Rich console, created (and rich imported) only when console output is used."""
+        from rich.console import Console
+        return Console()
     
     def format_console_output(self, ticket_info: JiraTicketInfo, pr_diff: PRDiff, 
                             review_result: ReviewResult) -> None:
@@ -63,7 +86,8 @@ class OutputFormatter:
             self._print_lgtm_comment(review_result.lgtm_comment)
     
     def format_markdown_output(self, ticket_info: JiraTicketInfo, pr_diff: PRDiff, 
-                             review_result: ReviewResult) -> str:
+                             review_result: ReviewResult, out: Optional[TextIO] = None,
+                             review_timestamp: Optional[datetime] = None) -> Optional[str]:
         """
         Format review results as markdown for GitHub comments or documentation.
         
@@ -71,107 +95,100 @@ class OutputFormatter:
             ticket_info: Jira ticket information
             pr_diff: PR diff information
             review_result: Review result to format
+            out: Writable text stream; the report is written to it line by line
+            review_timestamp: Time of the review (defaults to now)
             
         Returns:
-            Formatted markdown string
+            Formatted markdown string, or None if written to out
         """
-        lines = []
+        if out is None:
+            buffer = io.StringIO()
+            self.format_markdown_output(ticket_info, pr_diff, review_result, buffer, review_timestamp)
+            return buffer.getvalue()
+        
+        self._write_markdown(out, ticket_info, pr_diff, review_result, review_timestamp or datetime.now())
+        return None
+    
+    def _write_markdown(self, out: TextIO, ticket_info: JiraTicketInfo, pr_diff: PRDiff,
+                        review_result: ReviewResult, review_timestamp: datetime) -> None:
+        """Write the markdown report to out; every section after the header opens with a blank line."""
+        write = out.write
         
         # Header
-        lines.append(f"# Code Review Results")
-        lines.append(f"**Ticket:** [{ticket_info.ticket_key}] {ticket_info.summary}")
-        lines.append(f"**PR:** #{pr_diff.pr_number} - {pr_diff.title}")
-        lines.append(f"**Reviewed:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        lines.append("")
+        write("# Code Review Results\n")
+        write(f"**Ticket:** [{ticket_info.ticket_key}] {ticket_info.summary}\n")
+        write(f"**PR:** #{pr_diff.pr_number} - {pr_diff.title}\n")
+        write(f"**Reviewed:** {review_timestamp.strftime('%Y-%m-%d %H:%M:%S')}\n")
         
         # Status Badge
-        status_emoji = {
-            ReviewStatus.PASS: "✅",
-            ReviewStatus.CONDITIONAL: "⚠️", 
-            ReviewStatus.FAIL: "❌"
-        }
-        lines.append(f"## {status_emoji[review_result.status]} Review Status: {review_result.status.value.upper()}")
-        lines.append(f"**Overall Score:** {review_result.overall_score:.1%}")
-        lines.append("")
+        write(f"\n## {_STATUS_EMOJI[review_result.status]} Review Status: {review_result.status.value.upper()}\n")
+        write(f"**Overall Score:** {review_result.overall_score:.1%}\n")
         
         # Summary
-        lines.append("## 📋 Summary")
-        lines.append(review_result.summary)
-        lines.append("")
+        write("\n## 📋 Summary\n")
+        write(f"{review_result.summary}\n")
         
         # Acceptance Criteria
         if review_result.acceptance_criteria_analysis:
-            lines.append("## 🎯 Acceptance Criteria Analysis")
+            write("\n## 🎯 Acceptance Criteria Analysis\n")
             for i, ac in enumerate(review_result.acceptance_criteria_analysis, 1):
-                status_icon = "✅" if ac["fulfilled"] else "❌"
-                confidence = f"({ac['confidence']:.1%} confidence)"
-                lines.append(f"### {i}. {status_icon} {ac['criterion']} {confidence}")
+                if i > 1:
+                    write("\n")
                 
-                if ac["evidence"]:
-                    lines.append("**Evidence:**")
-                    for evidence in ac["evidence"]:
-                        lines.append(f"- {evidence}")
+                status_icon = "✅" if ac.fulfilled else "❌"
+                confidence = f"({ac.confidence:.1%} confidence)"
+                write(f"### {i}. {status_icon} {ac.criterion} {confidence}\n")
                 
-                if ac["gaps"]:
-                    lines.append("**Gaps:**")
-                    for gap in ac["gaps"]:
-                        lines.append(f"- {gap}")
+                if ac.evidence:
+                    write("**Evidence:**\n")
+                    write(_bullets(ac.evidence))
                 
-                if ac["reasoning"]:
-                    lines.append(f"**Reasoning:** {ac['reasoning']}")
+                if ac.gaps:
+                    write("**Gaps:**\n")
+                    write(_bullets(ac.gaps))
                 
-                lines.append("")
+                if ac.reasoning:
+                    write(f"**Reasoning:** {ac.reasoning}\n")
         
         # Code Quality Issues
         if review_result.code_quality_issues:
-            lines.append("## 🔍 Code Quality Issues")
-            for issue in review_result.code_quality_issues:
-                lines.append(f"- **{issue.get('file', 'Unknown')}**: {issue.get('message', 'No message')}")
-            lines.append("")
+            write("\n## 🔍 Code Quality Issues\n")
+            write("".join([f"- **{issue.get('file', 'Unknown')}**: {issue.get('message', 'No message')}\n"
+                           for issue in review_result.code_quality_issues]))
         
         # Test Analysis
         if review_result.test_analysis:
-            lines.append("## 🧪 Test Analysis")
+            write("\n## 🧪 Test Analysis\n")
             test_icon = "✅" if review_result.test_analysis.get("has_test_files", False) else "❌"
-            lines.append(f"{test_icon} **Test Coverage:** {review_result.test_analysis.get('recommendation', 'No analysis')}")
+            write(f"{test_icon} **Test Coverage:** {review_result.test_analysis.get('recommendation', 'No analysis')}\n")
             
             if review_result.test_analysis.get("test_files"):
-                lines.append("**Test Files:**")
-                for test_file in review_result.test_analysis["test_files"]:
-                    lines.append(f"- {test_file}")
-            lines.append("")
+                write("**Test Files:**\n")
+                write(_bullets(review_result.test_analysis["test_files"]))
         
         # Required Changes
         if review_result.required_changes:
-            lines.append("## ❗ Required Changes")
-            for change in review_result.required_changes:
-                lines.append(f"- {change}")
-            lines.append("")
+            write("\n## ❗ Required Changes\n")
+            write(_bullets(review_result.required_changes))
         
         # Suggestions
         if review_result.suggestions:
-            lines.append("## 💡 Suggestions for Improvement")
-            for suggestion in review_result.suggestions:
-                lines.append(f"- {suggestion}")
-            lines.append("")
+            write("\n## 💡 Suggestions for Improvement\n")
+            write(_bullets(review_result.suggestions))
         
         # Recommended Tests
         if review_result.recommended_tests:
-            lines.append("## 🧪 Recommended Test Cases")
-            for test in review_result.recommended_tests:
-                lines.append(f"- {test}")
-            lines.append("")
+            write("\n## 🧪 Recommended Test Cases\n")
+            write(_bullets(review_result.recommended_tests))
         
         # LGTM Comment
         if review_result.lgtm_comment:
-            lines.append("## 🚀 Final Verdict")
-            lines.append(review_result.lgtm_comment)
-            lines.append("")
-        
-        return "\n".join(lines)
+            write("\n## 🚀 Final Verdict\n")
+            write(f"{review_result.lgtm_comment}\n")
     
     def format_json_output(self, ticket_info: JiraTicketInfo, pr_diff: PRDiff, 
-                          review_result: ReviewResult) -> str:
+                          review_result: ReviewResult, out: Optional[TextIO] = None,
+                          review_timestamp: Optional[datetime] = None) -> Optional[str]:
         """
         Format review results as JSON for API consumption or data storage.
         
@@ -179,13 +196,41 @@ class OutputFormatter:
             ticket_info: Jira ticket information
             pr_diff: PR diff information
             review_result: Review result to format
+            out: Writable text stream to encode the JSON into
+            review_timestamp: Time of the review (defaults to now)
             
         Returns:
-            Formatted JSON string
+            Formatted JSON string, or None if written to out
+        """
+        output = self._json_document(ticket_info, pr_diff, review_result, review_timestamp or datetime.now())
+        return self._write_json(output, out)
+    
+    def format_json_reviews(self, ticket_info: JiraTicketInfo, reviews: List[Tuple[PRDiff, ReviewResult]],
+                            out: Optional[TextIO] = None,
+                            review_timestamp: Optional[datetime] = None) -> Optional[str]:
         """
-        output = {
+        Format the reviews of several PRs for one ticket as a single JSON array.
+        
+        Args:
+            ticket_info: Jira ticket information
+            reviews: List of (pr_diff, review_result) tuples
+            out: Writable text stream to encode the JSON into
+            review_timestamp: Time of the reviews (defaults to now)
+            
+        Returns:
+            Formatted JSON string, or None if written to out
+        """
+        review_timestamp = review_timestamp or datetime.now()
+        output = [self._json_document(ticket_info, pr_diff, review_result, review_timestamp)
+                  for pr_diff, review_result in reviews]
+        return self._write_json(output, out)
+    
+    def _json_document(self, ticket_info: JiraTicketInfo, pr_diff: PRDiff, review_result: ReviewResult,
+                       review_timestamp: datetime) -> Dict[str, Any]:
+        """Build the JSON document for one PR's review."""
+        return {
             "review_metadata": {
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": review_timestamp.isoformat(),
                 "ticket_key": ticket_info.ticket_key,
                 "ticket_summary": ticket_info.summary,
                 "pr_number": pr_diff.pr_number,
@@ -199,7 +244,7 @@ class OutputFormatter:
                 "lgtm_comment": review_result.lgtm_comment
             },
             "analysis": {
-                "acceptance_criteria": review_result.acceptance_criteria_analysis,
+                "acceptance_criteria": [asdict(ac) for ac in review_result.acceptance_criteria_analysis],
                 "code_quality_issues": review_result.code_quality_issues,
                 "test_analysis": review_result.test_analysis
             },
@@ -209,19 +254,30 @@ class OutputFormatter:
                 "recommended_tests": review_result.recommended_tests
             }
         }
-        
-        return json.dumps(output, indent=2, ensure_ascii=False)
+    
+    def _write_json(self, output: Any, out: Optional[TextIO]) -> Optional[str]:
+        """Encode output as indented JSON into out, or return it as a string."""
+        if HAS_ORJSON:
+            formatted = orjson.dumps(output, option=orjson.OPT_INDENT_2).decode()
+        elif out is not None:
+            json.dump(output, out, indent=2, ensure_ascii=False)
+            return None
+        else:
+            formatted = json.dumps(output, indent=2, ensure_ascii=False)
+        
+        if out is not None:
+            out.write(formatted)
+            return None
+        
+        return formatted
     
     def _print_header(self, ticket_info: JiraTicketInfo, pr_diff: PRDiff, review_result: ReviewResult):
         """Print formatted header."""
-        status_colors = {
-            ReviewStatus.PASS: "green",
-            ReviewStatus.CONDITIONAL: "yellow",
-            ReviewStatus.FAIL: "red"
-        }
+        from rich.panel import Panel
+        from rich.text import Text
         
         status_text = Text(f"Review Status: {review_result.status.value.upper()}", 
-                          style=f"bold {status_colors[review_result.status]}")
+                          style=f"bold {_STATUS_COLORS[review_result.status]}")
         
         header_text = f"""
 📋 **Ticket:** {ticket_info.ticket_key} - {ticket_info.summary}
@@ -242,14 +298,18 @@ class OutputFormatter:
     
     def _print_summary(self, review_result: ReviewResult):
         """Print formatted summary."""
+        from rich.markdown import Markdown
+        
         self.console.print(Markdown(f"## 📋 Summary\n{review_result.summary}"))
         self.console.print()
     
-    def _print_acceptance_criteria(self, ac_analysis: List[Dict[str, Any]]):
+    def _print_acceptance_criteria(self, ac_analysis: List[CriterionAnalysis]):
         """Print acceptance criteria analysis table."""
         if not ac_analysis:
             return
         
+        from rich.table import Table
+        
         table = Table(title="🎯 Acceptance Criteria Analysis")
         table.add_column("Criterion", style="cyan", no_wrap=False, max_width=40)
         table.add_column("Status", justify="center")
@@ -257,20 +317,20 @@ class OutputFormatter:
         table.add_column("Notes", style="yellow", no_wrap=False, max_width=30)
         
         for ac in ac_analysis:
-            status_icon = "✅" if ac["fulfilled"] else "❌"
-            confidence = f"{ac['confidence']:.1%}"
+            status_icon = "✅" if ac.fulfilled else "❌"
+            confidence = f"{ac.confidence:.1%}"
             
             # Create notes from evidence and gaps
             notes = []
-            if ac.get("evidence"):
-                notes.extend([f"✓ {e[:50]}..." for e in ac["evidence"][:2]])
-            if ac.get("gaps"):
-                notes.extend([f"✗ {g[:50]}..." for g in ac["gaps"][:2]])
+            if ac.evidence:
+                notes.extend([f"✓ {e[:50]}..." for e in ac.evidence[:2]])
+            if ac.gaps:
+                notes.extend([f"✗ {g[:50]}..." for g in ac.gaps[:2]])
             
             notes_text = "\n".join(notes) if notes else "No details"
             
             table.add_row(
-                ac["criterion"][:80] + ("..." if len(ac["criterion"]) > 80 else ""),
+                ac.criterion[:80] + ("..." if len(ac.criterion) > 80 else ""),
                 status_icon,
                 confidence,
                 notes_text
@@ -339,6 +399,8 @@ class OutputFormatter:
     
     def _print_lgtm_comment(self, lgtm_comment: str):
         """Print LGTM comment in a special panel."""
+        from rich.panel import Panel
+        
         panel = Panel(
             lgtm_comment,
             title="🚀 Final Verdict",
@@ -6,15 +6,54 @@ Fetches and analyzes GitHub PR diffs for code review.
 
 import os
 import re
+import fnmatch
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from urllib.parse import urlparse
+from dataclasses import asdict, dataclass
 from github import Github
 import logging
 
+from disk_cache import DiskCache
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Cached PR data is keyed on the PR's 'updated_at' timestamp, so the TTL
+# only bounds how long entries for unchanged PRs linger on disk.
+GITHUB_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# GitHub's maximum page size for the PR files endpoint
+GITHUB_PER_PAGE = 100
+MAX_PARALLEL_FILE_PAGES = 8
+
+# Code smell heuristics applied to added lines; the lookahead keeps 'def '/'class '
+# from matching on trailing whitespace, as the old strip-then-search check did
+_LONG_STRING_RE = re.compile(r'["\'][^"\']{20,}["\']')
+_COMMENTED_CODE_RE = re.compile(r'\s*(?://|#).*?(?:function|import|(?:def|class) (?=.*\S))', re.IGNORECASE)
+
+# Path components that mark a file as a test even without a pattern match
+_TEST_INDICATORS = frozenset(['test', 'tests', 'spec', 'specs', '__tests__'])
+
+# Lockfiles, minified bundles, vendored and generated code are not scanned for
+# fail keywords or code smells; neither are files with very large changes
+_SKIP_SCAN_RE = re.compile(r'(\.lock$|\.min\.(js|css)$|(^|/)(vendor|dist)/|\.pb\.go$|package-lock\.json$)')
+MAX_SCANNED_FILE_CHANGES = 2000
+
+@lru_cache(maxsize=32)
+def _keyword_regex(keywords: Tuple[str, ...]) -> "re.Pattern":
+    """
+    Compile lowercased keywords into one pattern that reports the longest keyword at every offset.
+    
+    The lookahead lets matches overlap, so a single finditer pass sees every keyword occurrence
+    except shorter keywords hidden inside a longer one found at the same offset.
+    """
+    alternation = "|".join(re.escape(k) for k in sorted(set(keywords), key=len, reverse=True))
+    return re.compile(f"(?=({alternation}))")
+
+@dataclass(slots=True)
 class FileChange:
     """Represents a single file change in a PR."""
     filename: str
@@ -24,8 +63,35 @@ class FileChange:
     changes: int
     patch: Optional[str]
     is_test_file: bool = False
+    
+    @classmethod
+    def from_github(cls, file, is_test_file: bool) -> "FileChange":
+        """
+        Build a FileChange from a PyGithub File, filling the slots directly.
+        
+        Args:
+            file: PyGithub File object from a PR's file list
+            is_test_file: Whether the file matched the test patterns
+            
+        Returns:
+            FileChange for the file
+        """
+        file_change = cls.__new__(cls)
+        file_change.filename = file.filename
+        file_change.status = file.status
+        file_change.additions = file.additions
+        file_change.deletions = file.deletions
+        file_change.changes = file.changes
+        file_change.patch = file.patch
+        file_change.is_test_file = is_test_file
+        return file_change
+    
+    @property
+    def skip_scan(self) -> bool:
+        """Whether the file is generated, vendored or too large to be worth scanning."""
+        return self.changes > MAX_SCANNED_FILE_CHANGES or _SKIP_SCAN_RE.search(self.filename) is not None
 
-@dataclass
+@dataclass(slots=True)
 class PRDiff:
     """Represents the complete diff of a pull request."""
     pr_number: int
@@ -41,24 +107,37 @@ class PRDiff:
     head_branch: str
     created_at: str
     updated_at: str
+    repo_name: str = ""
 
 class PRAnalyzer:
     """Handles GitHub PR fetching and analysis."""
     
-    def __init__(self, token: str, test_patterns: List[str] = None):
+    def __init__(self, token: str, test_patterns: List[str] = None,
+                 use_cache: bool = True, refresh_cache: bool = False):
         """
         Initialize GitHub client with token.
         
         Args:
             token: GitHub personal access token
             test_patterns: File patterns that indicate test files
+            use_cache: Read and write the on-disk PR cache
+            refresh_cache: Ignore cached PRs but store freshly fetched ones
         """
-        self.github = Github(token)
+        self.token = token
+        self.github = self._create_github_client()
         self.test_patterns = test_patterns or [
             "test_*.py", "*_test.py", "*.test.js", "*.spec.js",
             "*.test.ts", "*.spec.ts", "test/*.py", "tests/*.py",
             "__tests__/*", "spec/*"
         ]
+        
+        # Translate glob patterns to one regex so each filename is matched once; each
+        # alternative is anchored at the end, so '*.py' needs a real '.py' suffix
+        self._test_regex = re.compile("|".join(
+            f"(?:{fnmatch.translate(pattern)})" for pattern in self.test_patterns
+        ))
+        
+        self.cache = DiskCache("github", GITHUB_CACHE_TTL_SECONDS, enabled=use_cache, refresh=refresh_cache)
     
     def get_pr_diff(self, pr_url: str) -> PRDiff:
         """
@@ -76,29 +155,21 @@ class PRAnalyzer:
             repo = self.github.get_repo(repo_name)
             pr = repo.get_pull(pr_number)
             
-            # Get file changes
-            file_changes = []
-            total_additions = 0
-            total_deletions = 0
+            cache_key = self._cache_key(repo_name, pr_number, pr.updated_at.isoformat())
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Using cached GitHub data for {repo_name}#{pr_number}")
+                return self._pr_diff_from_dict(cached)
             
-            for file in pr.get_files():
-                is_test = self._is_test_file(file.filename)
-                
-                file_change = FileChange(
-                    filename=file.filename,
-                    status=file.status,
-                    additions=file.additions,
-                    deletions=file.deletions,
-                    changes=file.changes,
-                    patch=file.patch,
-                    is_test_file=is_test
-                )
-                
-                file_changes.append(file_change)
-                total_additions += file.additions
-                total_deletions += file.deletions
+            # Get file changes
+            file_changes = [
+                FileChange.from_github(file, self._is_test_file(file.filename))
+                for file in self._get_pr_files(pr, repo_name, pr_number)
+            ]
+            total_additions = sum(f.additions for f in file_changes)
+            total_deletions = sum(f.deletions for f in file_changes)
             
-            return PRDiff(
+            pr_diff = PRDiff(
                 pr_number=pr_number,
                 title=pr.title,
                 description=pr.body or "",
@@ -111,13 +182,71 @@ class PRAnalyzer:
                 base_branch=pr.base.ref,
                 head_branch=pr.head.ref,
                 created_at=pr.created_at.isoformat(),
-                updated_at=pr.updated_at.isoformat()
+                updated_at=pr.updated_at.isoformat(),
+                repo_name=repo_name
             )
             
+            self.cache.set(cache_key, asdict(pr_diff))
+            return pr_diff
+            
         except Exception as e:
             logger.error(f"Failed to fetch PR {pr_url}: {e}")
             raise
     
+    def _cache_key(self, repo_name: str, pr_number: int, updated_at: str) -> str:
+        """Build the cache key for a PR revision; test patterns decide is_test_file."""
+        return f"{repo_name}|{pr_number}|{updated_at}|{self._test_regex.pattern}"
+    
+    def _pr_diff_from_dict(self, data: Dict[str, any]) -> PRDiff:
+        """Rebuild a PRDiff from its cached dictionary form."""
+        file_changes = [FileChange(**f) for f in data.pop("file_changes")]
+        return PRDiff(file_changes=file_changes, **data)
+    
+    def _create_github_client(self, lazy: bool = False) -> Github:
+        """Create a GitHub client for this analyzer's token."""
+        return Github(self.token, per_page=GITHUB_PER_PAGE, lazy=lazy)
+    
+    def _get_pr_files(self, pr, repo_name: str, pr_number: int) -> List:
+        """
+        Fetch every page of a PR's changed files.
+        
+        The page count comes from pr.changed_files, and pages after the first are
+        fetched concurrently. A Github client's Requester is not safe to share
+        between threads, so each worker thread gets a lazy client of its own; it
+        makes no requests beyond the pages themselves.
+        
+        Args:
+            pr: PyGithub PullRequest object
+            repo_name: Repository full name (owner/repo)
+            pr_number: PR number
+            
+        Returns:
+            List of PyGithub File objects in API order
+        """
+        files = pr.get_files()
+        page_count = -(-pr.changed_files // GITHUB_PER_PAGE)
+        if page_count <= 1:
+            return list(files)
+        
+        worker = threading.local()
+        clients = []
+        
+        def get_page(page: int) -> List:
+            if not hasattr(worker, "files"):
+                client = self._create_github_client(lazy=True)
+                clients.append(client)
+                worker.files = client.get_repo(repo_name).get_pull(pr_number).get_files()
+            return worker.files.get_page(page)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=min(page_count - 1, MAX_PARALLEL_FILE_PAGES)) as executor:
+                pages = executor.map(get_page, range(1, page_count))
+                first_page = files.get_page(0)
+                return first_page + [file for page in pages for file in page]
+        finally:
+            for client in clients:
+                client.close()
+    
     def _parse_pr_url(self, pr_url: str) -> Tuple[str, int]:
         """
         Parse GitHub PR URL to extract repo name and PR number.
@@ -128,15 +257,16 @@ class PRAnalyzer:
         Returns:
             Tuple of (repo_name, pr_number)
         """
-        # Pattern to match GitHub PR URLs
-        pattern = r'https://github\.com/([^/]+/[^/]+)/pull/(\d+)'
-        match = re.search(pattern, pr_url)
+        # Expected shape: https://github.com/<owner>/<repo>/pull/<number>[/...]
+        url = urlparse(pr_url.strip())
+        parts = url.path.split('/')[1:]
         
-        if not match:
+        if (url.scheme != 'https' or url.netloc != 'github.com' or len(parts) < 4
+                or not parts[0] or not parts[1] or parts[2] != 'pull' or not parts[3].isdigit()):
             raise ValueError(f"Invalid GitHub PR URL: {pr_url}")
         
-        repo_name = match.group(1)
-        pr_number = int(match.group(2))
+        repo_name = f"{parts[0]}/{parts[1]}"
+        pr_number = int(parts[3])
         
         return repo_name, pr_number
     
@@ -152,17 +282,11 @@ class PRAnalyzer:
         """
         filename_lower = filename.lower()
         
-        for pattern in self.test_patterns:
-            # Convert glob pattern to regex
-            regex_pattern = pattern.replace('*', '.*').replace('?', '.')
-            if re.search(regex_pattern, filename_lower):
-                return True
+        if self._test_regex.search(filename_lower):
+            return True
         
         # Additional heuristics
-        path_parts = filename_lower.split('/')
-        test_indicators = ['test', 'tests', 'spec', 'specs', '__tests__']
-        
-        return any(indicator in path_parts for indicator in test_indicators)
+        return not _TEST_INDICATORS.isdisjoint(filename_lower.split('/'))
     
     def analyze_code_quality(self, pr_diff: PRDiff, fail_keywords: List[str] = None) -> Dict[str, any]:
         """
@@ -177,15 +301,29 @@ class PRAnalyzer:
         """
         fail_keywords = fail_keywords or ["TODO", "FIXME", "HACK", "console.log", "print("]
         
+        # Only diffs fetched from GitHub carry the identity needed for a cache key
+        cache_key = None
+        if pr_diff.repo_name:
+            cache_key = "quality|" + self._cache_key(pr_diff.repo_name, pr_diff.pr_number, pr_diff.updated_at)
+            cache_key += "|" + "|".join(fail_keywords)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        fail_keywords_lc = [k.lower() for k in fail_keywords]
+        keyword_regex = _keyword_regex(tuple(fail_keywords_lc))
+        
         issues = []
         test_coverage = self._analyze_test_coverage(pr_diff)
         code_smells = []
         
         for file_change in pr_diff.file_changes:
-            if file_change.patch:
-                # Check for fail keywords
-                for keyword in fail_keywords:
-                    if keyword.lower() in file_change.patch.lower():
+            if file_change.patch and not file_change.skip_scan:
+                # Check for fail keywords in a single scan of the patch
+                patch_lower = file_change.patch.lower()
+                found = {m.group(1) for m in keyword_regex.finditer(patch_lower)}
+                for keyword, keyword_lower in zip(fail_keywords, fail_keywords_lc):
+                    if keyword_lower in found or any(keyword_lower in f for f in found):
                         issues.append({
                             "file": file_change.filename,
                             "type": "fail_keyword",
@@ -197,7 +335,7 @@ class PRAnalyzer:
                 smells = self._detect_code_smells(file_change)
                 code_smells.extend(smells)
         
-        return {
+        analysis = {
             "issues": issues,
             "test_coverage": test_coverage,
             "code_smells": code_smells,
@@ -208,22 +346,34 @@ class PRAnalyzer:
                 "code_smell_count": len(code_smells)
             }
         }
+        
+        if cache_key:
+            self.cache.set(cache_key, analysis)
+        
+        return analysis
     
     def _analyze_test_coverage(self, pr_diff: PRDiff) -> Dict[str, any]:
         """Analyze test coverage in the PR."""
-        test_files = [f for f in pr_diff.file_changes if f.is_test_file]
-        non_test_files = [f for f in pr_diff.file_changes if not f.is_test_file]
+        # Partition in one pass; only the test filenames and the code file count are needed
+        test_filenames = []
+        code_file_count = 0
+        for f in pr_diff.file_changes:
+            if f.is_test_file:
+                test_filenames.append(f.filename)
+            else:
+                code_file_count += 1
         
         # Calculate ratios
-        test_to_code_ratio = len(test_files) / max(len(non_test_files), 1)
+        test_file_count = len(test_filenames)
+        test_to_code_ratio = test_file_count / max(code_file_count, 1)
         
         return {
-            "has_test_files": len(test_files) > 0,
-            "test_file_count": len(test_files),
-            "code_file_count": len(non_test_files),
+            "has_test_files": test_file_count > 0,
+            "test_file_count": test_file_count,
+            "code_file_count": code_file_count,
             "test_to_code_ratio": test_to_code_ratio,
-            "test_files": [f.filename for f in test_files],
-            "recommendation": self._get_test_recommendation(test_to_code_ratio, len(test_files))
+            "test_files": test_filenames,
+            "recommendation": self._get_test_recommendation(test_to_code_ratio, test_file_count)
         }
     
     def _get_test_recommendation(self, ratio: float, test_count: int) -> str:
@@ -241,62 +391,65 @@ class PRAnalyzer:
         """Detect potential code smells in a file change."""
         smells = []
         
-        if not file_change.patch:
+        if not file_change.patch or file_change.skip_scan:
             return smells
         
-        patch_lines = file_change.patch.split('\n')
-        
-        # Check for added lines (start with +)
-        added_lines = [line[1:] for line in patch_lines if line.startswith('+') and len(line) > 1]
-        
-        for i, line in enumerate(added_lines):
-            line_stripped = line.strip()
+        # Check added lines (start with +) in the same pass that finds them;
+        # line numbers count added lines only
+        line_number = 0
+        for raw_line in file_change.patch.splitlines():
+            if len(raw_line) < 2 or raw_line[0] != '+':
+                continue
+            
+            line = raw_line[1:]
+            line_number += 1
+            line_length = len(line)
             
             # Long lines
-            if len(line) > 120:
+            if line_length > 120:
                 smells.append({
                     "file": file_change.filename,
                     "type": "long_line",
-                    "line": i + 1,
-                    "message": f"Line exceeds 120 characters ({len(line)} chars)"
+                    "line": line_number,
+                    "message": f"Line exceeds 120 characters ({line_length} chars)"
                 })
             
             # Deep nesting (simplified heuristic)
-            indent_level = len(line) - len(line.lstrip())
+            indent_level = line_length - len(line.lstrip())
             if indent_level > 24:  # More than 6 levels of 4-space indentation
                 smells.append({
                     "file": file_change.filename,
                     "type": "deep_nesting",
-                    "line": i + 1,
+                    "line": line_number,
                     "message": "Deeply nested code detected"
                 })
             
             # Commented out code (simplified detection)
-            if line_stripped.startswith('//') or line_stripped.startswith('#'):
-                if any(keyword in line_stripped.lower() for keyword in ['function', 'def ', 'class ', 'import']):
-                    smells.append({
-                        "file": file_change.filename,
-                        "type": "commented_code",
-                        "line": i + 1,
-                        "message": "Potential commented out code"
-                    })
+            if _COMMENTED_CODE_RE.match(line):
+                smells.append({
+                    "file": file_change.filename,
+                    "type": "commented_code",
+                    "line": line_number,
+                    "message": "Potential commented out code"
+                })
             
             # Hardcoded strings/numbers (simplified detection)
-            if re.search(r'["\'][^"\']{20,}["\']', line_stripped):
+            if _LONG_STRING_RE.search(line):
                 smells.append({
                     "file": file_change.filename,
                     "type": "hardcoded_string",
-                    "line": i + 1,
+                    "line": line_number,
                     "message": "Long hardcoded string detected"
                 })
         
         return smells
 
-def create_pr_analyzer(test_patterns: List[str] = None) -> PRAnalyzer:
+def create_pr_analyzer(test_patterns: List[str] = None, use_cache: bool = True,
+                       refresh_cache: bool = False) -> PRAnalyzer:
     """Factory function to create PRAnalyzer with environment variables."""
     token = os.getenv('GITHUB_TOKEN')
     
     if not token:
         raise ValueError("GITHUB_TOKEN environment variable must be set")
     
-    return PRAnalyzer(token, test_patterns) 
\ No newline at end of file
+    return PRAnalyzer(token, test_patterns, use_cache=use_cache, refresh_cache=refresh_cache) 
\ No newline at end of file
@@ -5,7 +5,15 @@ Evaluates PR code against Jira acceptance criteria using AI for intelligent anal
 """
 
 import os
-from typing import Dict, List, Optional, Any
+import re
+import json
+import string
+import hashlib
+from functools import lru_cache
+from itertools import chain, islice
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, FrozenSet, List, Optional, Any, Sequence, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import logging
@@ -22,26 +30,307 @@ try:
 except ImportError:
     HAS_OPENAI = False
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# HTTP/2 in the SDKs' HTTP client needs the optional h2 package
+try:
+    import h2
+    HAS_H2 = True
+except ImportError:
+    HAS_H2 = False
+
+from disk_cache import DiskCache
 from jira_parser import JiraTicketInfo
 from pr_analyzer import PRDiff
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Criterion analyses are keyed on the exact PR context sent to the model, so
+# the TTL only bounds how long entries for unchanged PRs linger on disk.
+AI_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Acceptance criteria evaluated per AI call; larger batches give the model
+# too much to track in one response
+MAX_CRITERIA_PER_CALL = 8
+
+# Upper bound on response tokens for a batched criteria call
+MAX_BATCH_RESPONSE_TOKENS = 4096
+
+# Criteria analyzed in the same call as the code review; the rest are batched
+# separately so the review keeps room in the response
+MAX_COMBINED_CRITERIA = 3
+
+# More code quality issues than this fails a PR outright, before any AI calls
+MAX_QUALITY_ISSUES = 5
+
+# With fast_fail, acceptance criteria scoring below this skip the separate code review
+FAST_FAIL_AC_SCORE = 0.3
+
+# Characters of patch text sent to the model per review, and per file
+PATCH_EXCERPT_BUDGET = 8000
+MAX_PATCH_EXCERPT_CHARS = 4000
+# Keyword hits beyond this many do not make a file rank higher
+MAX_RELEVANCE_HITS = 3
+
+# Words too common in acceptance criteria to say which file implements them
+_STOPWORDS = frozenset([
+    "the", "and", "for", "with", "that", "this", "are", "should", "must", "can", "will",
+    "when", "from", "into", "have", "has", "not", "all", "any", "each", "user", "users",
+    "able", "given", "then", "also", "only", "been", "being", "was", "were", "its",
+])
+
+@lru_cache(maxsize=1024)
+def _criterion_keywords(text: str) -> FrozenSet[str]:
+    """Distinctive lowercase words of a criterion, memoized across PRs and retries."""
+    return frozenset(re.findall(r"[a-z]{3,}", text.lower())) - _STOPWORDS
+
+# AI requests in flight at once across the whole process (including parallel
+# PR reviews), to stay inside provider rate limits
+MAX_PARALLEL_AI_CALLS = 8
+_AI_CALL_SLOTS = threading.BoundedSemaphore(MAX_PARALLEL_AI_CALLS)
+
+# JSON object wrapped in a markdown code fence, e.g. ```json {...} ```
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.S)
+
+# Reasoning models served through Ollama (e.g. deepseek-r1) open with a thinking block
+_THINK_OPEN = "<think>"
+_THINK_CLOSE = "</think>"
+
+class _TruncatedResponse(Exception):
+    """Raised when a response stopped at its token limit before the JSON object closed."""
+
+class _JsonStreamScanner:
+    """
+    Watches streamed response text for the first complete top-level JSON object.
+    
+    Braces inside string literals and inside a leading <think> block are ignored,
+    and a balanced {...} that is not valid JSON (e.g. braces in prose) is skipped.
+    """
+    
+    def __init__(self):
+        self.text = ""
+        self.json_text: Optional[str] = None
+        self._pos = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._think_checked = False
+    
+    @property
+    def result(self) -> str:
+        """The JSON object if one was found, otherwise all text received."""
+        return self.json_text if self.json_text is not None else self.text
+    
+    def feed(self, chunk: str) -> bool:
+        """Append streamed text; return True once a complete JSON object has been received."""
+        self.text += chunk
+        text = self.text
+        
+        if not self._think_checked:
+            head = text.lstrip()
+            if _THINK_OPEN.startswith(head):
+                return False
+            if head.startswith(_THINK_OPEN):
+                close = text.find(_THINK_CLOSE)
+                if close < 0:
+                    return False
+                self._pos = close + len(_THINK_CLOSE)
+            self._think_checked = True
+        
+        i = self._pos
+        while i < len(text):
+            c = text[i]
+            if self._start < 0:
+                if c == "{":
+                    self._start, self._depth = i, 1
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c == "{":
+                self._depth += 1
+            elif c == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = text[self._start:i + 1]
+                    try:
+                        json.loads(candidate)
+                    except json.JSONDecodeError:
+                        # Not the response object; rescan from just after its opening brace
+                        i, self._start = self._start, -1
+                    else:
+                        self.json_text = candidate
+                        return True
+            i += 1
+        
+        self._pos = i
+        return False
+
+# Prompt templates, parsed once at import; placeholders are filled per call
+_PR_CONTEXT_TMPL = string.Template("""
+You are a senior code reviewer evaluating a GitHub pull request.
+
+**Pull Request Information:**
+- Title: $title
+- Description: $description...
+- Files Changed: $files_changed
+- Additions: +$additions, Deletions: -$deletions
+
+**Code Changes (relevant excerpts):**
+$changes
+""")
+
+_CRITERION_TMPL = string.Template("""
+**Acceptance Criterion to Evaluate:**
+$criterion
+
+**Instructions:**
+Analyze whether this pull request fulfills the specific acceptance criterion above.
+
+Respond in JSON format:
+{
+    "fulfilled": true/false,
+    "confidence": 0.0-1.0,
+    "evidence": ["specific evidence from code that supports fulfillment"],
+    "gaps": ["specific missing elements or concerns"],
+    "reasoning": "detailed explanation of your analysis"
+}
+
+Be specific and reference actual code changes where possible.
+""")
+
+_CRITERIA_BATCH_TMPL = string.Template("""
+**Acceptance Criteria to Evaluate:**
+$criteria
+
+**Instructions:**
+Analyze whether this pull request fulfills each acceptance criterion above. Evaluate every
+criterion independently and return exactly one result per criterion id.
+
+Respond in JSON format:
+{
+    "results": [
+        {
+            "id": 0,
+            "fulfilled": true/false,
+            "confidence": 0.0-1.0,
+            "evidence": ["specific evidence from code that supports fulfillment"],
+            "gaps": ["specific missing elements or concerns"],
+            "reasoning": "detailed explanation of your analysis"
+        }
+    ]
+}
+
+Be specific and reference actual code changes where possible.
+""")
+
+_COMBINED_REVIEW_TMPL = string.Template("""
+**Acceptance Criteria to Evaluate:**
+$criteria
+
+**Context:**
+- Jira Ticket: $ticket_key - $summary
+- Problem: $problem
+- PR: #$pr_number - $title
+
+**Files Changed:** $files
+
+**Instructions:**
+1. Analyze whether this pull request fulfills each acceptance criterion above. Evaluate every
+   criterion independently and return exactly one result per criterion id.
+2. Perform a comprehensive code review of this pull request, covering security vulnerabilities,
+   performance implications, code maintainability and readability, error handling, edge cases
+   and architecture decisions.
+
+Respond in JSON format:
+{
+    "results": [
+        {
+            "id": 0,
+            "fulfilled": true/false,
+            "confidence": 0.0-1.0,
+            "evidence": ["specific evidence from code that supports fulfillment"],
+            "gaps": ["specific missing elements or concerns"],
+            "reasoning": "detailed explanation of your analysis"
+        }
+    ],
+    "code_review": {
+        "security_issues": ["list of security concerns"],
+        "performance_concerns": ["list of performance issues"],
+        "maintainability_issues": ["list of maintainability problems"],
+        "positive_aspects": ["list of good practices found"],
+        "overall_assessment": "summary assessment"
+    }
+}
+
+Be specific, reference actual code changes where possible, and focus on actionable feedback.
+""")
+
+_CODE_REVIEW_TMPL = string.Template("""
+Perform a comprehensive code review of this pull request.
+
+**Context:**
+- Jira Ticket: $ticket_key - $summary
+- Problem: $problem
+- PR: #$pr_number - $title
+
+**Key Areas to Review:**
+1. Security vulnerabilities
+2. Performance implications  
+3. Code maintainability and readability
+4. Error handling
+5. Edge cases
+6. Architecture decisions
+
+**Files Changed:** $files
+
+Provide a structured analysis in JSON format:
+{
+    "security_issues": ["list of security concerns"],
+    "performance_concerns": ["list of performance issues"], 
+    "maintainability_issues": ["list of maintainability problems"],
+    "positive_aspects": ["list of good practices found"],
+    "overall_assessment": "summary assessment"
+}
+
+Focus on actionable feedback and specific improvements.
+""")
+
 class ReviewStatus(Enum):
     """Review result status."""
     PASS = "pass"
     FAIL = "fail"
     CONDITIONAL = "conditional"
 
-@dataclass
+@dataclass(slots=True)
+class CriterionAnalysis:
+    """AI assessment of one acceptance criterion."""
+    criterion: str
+    fulfilled: bool
+    confidence: float  # 0.0 to 1.0
+    evidence: List[str]
+    gaps: List[str]
+    reasoning: str
+
+@dataclass(slots=True)
 class ReviewResult:
     """Complete review result."""
     status: ReviewStatus
     overall_score: float  # 0.0 to 1.0
     lgtm_comment: Optional[str]
     summary: str
-    acceptance_criteria_analysis: List[Dict[str, Any]]
+    acceptance_criteria_analysis: List[CriterionAnalysis]
     code_quality_issues: List[Dict[str, Any]]
     test_analysis: Dict[str, Any]
     suggestions: List[str]
@@ -51,7 +340,12 @@ class ReviewResult:
 class ReviewEngine:
     """AI-powered code review engine."""
     
-    def __init__(self, provider: str = "anthropic", model: str = None, api_key: str = None, base_url: str = None):
+    __slots__ = ("provider", "model", "base_url", "api_key", "client", "cache",
+                 "separate_code_review", "fast_fail")
+    
+    def __init__(self, provider: str = "anthropic", model: str = None, api_key: str = None, base_url: str = None,
+                 use_cache: bool = True, refresh_cache: bool = False, separate_code_review: bool = False,
+                 fast_fail: bool = False):
         """
         Initialize AI client.
         
@@ -60,12 +354,27 @@ class ReviewEngine:
             model: Model name
             api_key: API key for the provider (not needed for ollama)
             base_url: Base URL for the provider (for ollama: http://localhost:11434/v1)
+            use_cache: Read and write the on-disk criterion analysis cache
+            refresh_cache: Ignore cached analyses but store fresh ones
+            separate_code_review: Request the code review in its own call instead of
+                together with the first criteria batch (for models with small context windows)
+            fast_fail: Skip the code review call when the acceptance criteria score is
+                already below FAST_FAIL_AC_SCORE; ignored (with a warning) without
+                separate_code_review, since the combined call reviews the code before
+                any criteria are scored
         """
+        if fast_fail and not separate_code_review:
+            logger.warning("fast_fail only applies with separate_code_review; ignoring it")
+            fast_fail = False
+        
         self.provider = provider.lower()
         self.model = model
         self.base_url = base_url
         self.api_key = api_key or self._get_api_key()
         self.client = self._initialize_client()
+        self.cache = DiskCache("ai", AI_CACHE_TTL_SECONDS, enabled=use_cache, refresh=refresh_cache)
+        self.separate_code_review = separate_code_review
+        self.fast_fail = fast_fail
     
     def _get_api_key(self) -> str:
         """Get API key from environment variables."""
@@ -83,11 +392,11 @@ class ReviewEngine:
         if self.provider == "anthropic":
             if not HAS_ANTHROPIC:
                 raise ImportError("anthropic package not installed")
-            return anthropic.Anthropic(api_key=self.api_key)
+            return anthropic.Anthropic(api_key=self.api_key, http_client=self._http_client(anthropic))
         elif self.provider == "openai":
             if not HAS_OPENAI:
                 raise ImportError("openai package not installed")
-            return openai.OpenAI(api_key=self.api_key)
+            return openai.OpenAI(api_key=self.api_key, http_client=self._http_client(openai))
         elif self.provider == "ollama":
             if not HAS_OPENAI:
                 raise ImportError("openai package not installed (required for ollama compatibility)")
@@ -95,11 +404,33 @@ class ReviewEngine:
             base_url = self.base_url or "http://localhost:11434/v1"
             return openai.OpenAI(
                 api_key="ollama",  # Ollama doesn't require a real API key
-                base_url=base_url
+                base_url=base_url,
+                http_client=self._http_client(openai)
             )
         else:
             raise ValueError(f"Unknown provider: {self.provider}")
     
+    def _http_client(self, sdk):
+        """
+        Build the HTTP client for an SDK module, or None to use the SDK default.
+        
+        The client keeps one connection pool for every call made by this engine;
+        with h2 installed it negotiates HTTP/2 so concurrent calls share a connection.
+        """
+        if not HAS_H2:
+            return None
+        return sdk.DefaultHttpxClient(http2=True)
+    
+    def close(self):
+        """Close the AI client and its pooled connections."""
+        self.client.close()
+    
+    def __enter__(self) -> "ReviewEngine":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def review_pr(self, ticket_info: JiraTicketInfo, pr_diff: PRDiff, 
                   code_quality_analysis: Dict[str, Any]) -> ReviewResult:
         """
@@ -115,17 +446,46 @@ class ReviewEngine:
         """
         logger.info(f"Starting review for PR #{pr_diff.pr_number} against ticket {ticket_info.ticket_key}")
         
-        # Analyze acceptance criteria fulfillment
-        ac_analysis = self._analyze_acceptance_criteria(ticket_info, pr_diff)
+        quality_summary = code_quality_analysis.get("summary") or {}
+        total_issues = quality_summary.get("total_issues", 0)
+        has_tests = quality_summary.get("has_tests", False)
         
-        # Perform AI-powered code review
-        ai_review = self._ai_code_review(ticket_info, pr_diff)
+        # The code quality gate alone decides this review, so skip the AI calls
+        if total_issues > MAX_QUALITY_ISSUES:
+            logger.info(f"PR has {total_issues} code quality issues, failing without AI review")
+            return self._build_fail_result(ticket_info, pr_diff, code_quality_analysis, total_issues, has_tests)
+        
+        # Both AI paths share the same PR context, so build it once
+        context = self._build_pr_context(pr_diff, ticket_info.acceptance_criteria)
+        
+        # The criteria analysis and the general code review are independent, so their AI calls overlap
+        # (with fast_fail the separate code review waits for the criteria score instead)
+        deferred_review = self.separate_code_review and self.fast_fail
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_AI_CALLS) as executor:
+            # Perform AI-powered code review
+            if self.separate_code_review and not deferred_review:
+                ai_review_future = executor.submit(self._ai_code_review, ticket_info, pr_diff, context)
+            
+            # Analyze acceptance criteria fulfillment, by default together with the code review
+            ac_analysis, ai_review = self._analyze_acceptance_criteria(
+                ticket_info, pr_diff, executor, context, with_code_review=not self.separate_code_review
+            )
+            fulfilled_count = [bool(ac.fulfilled) for ac in ac_analysis].count(True)
+            
+            if deferred_review:
+                if self._acceptance_score(ac_analysis, fulfilled_count) < FAST_FAIL_AC_SCORE:
+                    logger.info("Acceptance criteria score too low, skipping AI code review")
+                    ai_review = self._empty_code_review("Skipped: acceptance criteria largely unfulfilled")
+                else:
+                    ai_review = self._ai_code_review(ticket_info, pr_diff, context)
+            elif self.separate_code_review:
+                ai_review = ai_review_future.result()
         
         # Calculate overall score
-        overall_score = self._calculate_overall_score(ac_analysis, code_quality_analysis, ai_review)
+        overall_score = self._calculate_overall_score(ac_analysis, fulfilled_count, total_issues, has_tests, ai_review)
         
         # Determine status
-        status = self._determine_status(overall_score, ac_analysis, code_quality_analysis)
+        status = self._determine_status(overall_score, ac_analysis, total_issues)
         
         # Generate recommendations
         suggestions = self._generate_suggestions(ac_analysis, code_quality_analysis, ai_review)
@@ -136,7 +496,7 @@ class ReviewEngine:
         lgtm_comment = self._generate_lgtm_comment(status, overall_score) if status == ReviewStatus.PASS else None
         
         # Create summary
-        summary = self._create_summary(status, overall_score, ac_analysis, code_quality_analysis)
+        summary = self._create_summary(status, overall_score, ac_analysis, fulfilled_count, total_issues, has_tests)
         
         return ReviewResult(
             status=status,
@@ -151,202 +511,550 @@ class ReviewEngine:
             recommended_tests=recommended_tests
         )
     
-    def _analyze_acceptance_criteria(self, ticket_info: JiraTicketInfo, pr_diff: PRDiff) -> List[Dict[str, Any]]:
-        """Analyze how well the PR fulfills acceptance criteria."""
+    def _build_fail_result(self, ticket_info: JiraTicketInfo, pr_diff: PRDiff,
+                           code_quality_analysis: Dict[str, Any], total_issues: int, has_tests: bool) -> ReviewResult:
+        """Build a FAIL result from the code quality analysis alone, without AI calls."""
+        ai_review = self._empty_code_review("Skipped: too many code quality issues")
+        overall_score = self._calculate_overall_score([], 0, total_issues, has_tests, ai_review)
+        summary = self._create_summary(ReviewStatus.FAIL, overall_score, [], 0, total_issues, has_tests)
+        
+        return ReviewResult(
+            status=ReviewStatus.FAIL,
+            overall_score=overall_score,
+            lgtm_comment=None,
+            summary=f"{summary}\n**AI Review:** skipped, more than {MAX_QUALITY_ISSUES} code quality issues",
+            acceptance_criteria_analysis=[],
+            code_quality_issues=code_quality_analysis.get("issues", []),
+            test_analysis=code_quality_analysis.get("test_coverage", {}),
+            suggestions=self._generate_suggestions([], code_quality_analysis, ai_review),
+            required_changes=self._identify_required_changes([], code_quality_analysis),
+            recommended_tests=self._recommend_tests(ticket_info, pr_diff, code_quality_analysis)
+        )
+    
+    def _analyze_acceptance_criteria(self, ticket_info: JiraTicketInfo, pr_diff: PRDiff,
+                                     executor: Optional[ThreadPoolExecutor] = None,
+                                     context: Optional[str] = None,
+                                     with_code_review: bool = False) -> Tuple[List[CriterionAnalysis], Optional[Dict[str, Any]]]:
+        """
+        Analyze how well the PR fulfills acceptance criteria.
+        
+        Args:
+            ticket_info: Jira ticket information
+            pr_diff: PR diff information
+            executor: When given, batches are analyzed concurrently on it
+            context: Prebuilt PR context; built from pr_diff when omitted
+            with_code_review: Also perform the general code review, in the same
+                call as the first batch of criteria
+            
+        Returns:
+            One analysis per acceptance criterion, and the code review
+            (None unless with_code_review is set)
+        """
         ac_analysis = []
+        criteria = ticket_info.acceptance_criteria
+        context = context or self._build_pr_context(pr_diff, criteria)
+        
+        # Reuse analyses of criteria already evaluated against this exact PR content; the
+        # excerpt in the context depends on the whole criteria list, so it is not part of the key
+        pr_key = self._pr_content_key(pr_diff)
+        analyses = [self.cache.get(self._criterion_cache_key(criterion, pr_key)) for criterion in criteria]
+        missing = [i for i, analysis in enumerate(analyses) if analysis is None]
+        if len(missing) < len(criteria):
+            logger.info(f"Using cached AI analysis for {len(criteria) - len(missing)} criteria")
+        
+        # Use AI to analyze the remaining criteria, several per call; the first few share
+        # the code review's call
+        review_batch = missing[:MAX_COMBINED_CRITERIA] if with_code_review else None
+        batched = missing[len(review_batch):] if review_batch else missing
+        batches = [batched[start:start + MAX_CRITERIA_PER_CALL]
+                   for start in range(0, len(batched), MAX_CRITERIA_PER_CALL)]
+        review_args = ([criteria[i] for i in review_batch], ticket_info, pr_diff, context, pr_key) if review_batch else None
+        
+        # The combined call is the slowest, so start it before the other batches rather than after them
+        review_future = executor.submit(self._ai_review_with_criteria, *review_args) if executor and review_args else None
+        
+        run = executor.map if executor else map
+        batch_results = run(
+            lambda batch: self._ai_analyze_criteria_batch([criteria[i] for i in batch], context, pr_key), batches
+        )
+        batch_results = list(zip(batches, batch_results))
+        
+        ai_review = None
+        if review_args:
+            review_analyses, ai_review = (review_future.result() if review_future
+                                          else self._ai_review_with_criteria(*review_args))
+            batch_results.append((review_batch, review_analyses))
+        elif with_code_review:
+            # Nothing left to analyze, so the code review gets a call of its own
+            ai_review = self._ai_code_review(ticket_info, pr_diff, context)
+        
+        for batch, batch_analyses in batch_results:
+            for i, analysis in zip(batch, batch_analyses):
+                analyses[i] = analysis
+        
+        for criterion, analysis in zip(criteria, analyses):
+            ac_analysis.append(CriterionAnalysis(
+                criterion=criterion,
+                fulfilled=analysis.get("fulfilled", False),
+                confidence=analysis.get("confidence", 0.5),
+                evidence=analysis.get("evidence", []),
+                gaps=analysis.get("gaps", []),
+                reasoning=analysis.get("reasoning", "")
+            ))
+        
+        return ac_analysis, ai_review
+    
+    def _pr_content_key(self, pr_diff: PRDiff) -> str:
+        """Digest of the PR's title, description and patches, for keying cached analyses."""
+        digest = hashlib.sha256()
+        parts = chain((pr_diff.title, pr_diff.description),
+                      *[(file_change.filename, file_change.patch) for file_change in pr_diff.file_changes])
+        for part in parts:
+            digest.update((part or "").encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+    
+    def _criterion_cache_key(self, criterion: str, pr_key: str) -> str:
+        """Build the cache key for a criterion analyzed against a PR (see _pr_content_key)."""
+        return f"{self.provider}|{self.model}|{pr_key}|{criterion}"
+    
+    def _ai_analyze_criteria_batch(self, criteria: List[str], context: str, pr_key: str) -> List[Dict[str, Any]]:
+        """
+        Use AI to analyze several criteria in one call.
+        
+        Criteria missing from the response (e.g. it was cut off at the token
+        limit) are split in half and each half is analyzed separately, down to
+        the per-criterion prompt for a single criterion. If the AI call itself
+        fails, every criterion gets an error analysis without further calls.
+        
+        Args:
+            criteria: Acceptance criteria to analyze
+            context: Shared PR context (see _build_pr_context)
+            pr_key: PR content key for caching (see _pr_content_key)
+            
+        Returns:
+            One analysis dictionary per criterion, in the same order
+        """
+        if len(criteria) == 1:
+            return [self._ai_analyze_criterion(criteria[0], context, pr_key)]
+        
+        prompt = self._build_criteria_batch_prompt(criteria)
+        max_tokens = min(2000 * len(criteria), MAX_BATCH_RESPONSE_TOKENS)
+        
+        try:
+            response = self._call_ai(prompt, max_tokens=max_tokens, context=context, raise_on_truncation=True)
+            analyses = self._parse_criteria_batch_response(response, len(criteria))
+        except _TruncatedResponse:
+            logger.info(f"Batched analysis of {len(criteria)} criteria hit the token limit")
+            analyses = [None] * len(criteria)
+        except Exception as e:
+            logger.error(f"Batched AI analysis failed for {len(criteria)} criteria: {e}")
+            return [self._failed_analysis(e) for _ in criteria]
+        
+        self._complete_batch(criteria, analyses, context, pr_key)
+        return analyses
+    
+    def _ai_review_with_criteria(self, criteria: List[str], ticket_info: JiraTicketInfo, pr_diff: PRDiff,
+                                 context: str, pr_key: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Use AI to analyze a batch of criteria and review the code in one call.
+        
+        Criteria missing from the response are split up and analyzed as in
+        _ai_analyze_criteria_batch, and a missing code review falls back to
+        _ai_code_review. If the AI call itself fails, no further calls are made.
         
-        for i, criterion in enumerate(ticket_info.acceptance_criteria):
-            # Use AI to analyze each criterion
-            analysis = self._ai_analyze_criterion(criterion, pr_diff)
+        Args:
+            criteria: Acceptance criteria to analyze
+            ticket_info: Jira ticket information
+            pr_diff: PR diff information
+            context: Shared PR context (see _build_pr_context)
+            pr_key: PR content key for caching (see _pr_content_key)
             
-            ac_analysis.append({
-                "criterion": criterion,
-                "fulfilled": analysis.get("fulfilled", False),
-                "confidence": analysis.get("confidence", 0.5),
-                "evidence": analysis.get("evidence", []),
-                "gaps": analysis.get("gaps", []),
-                "reasoning": analysis.get("reasoning", "")
-            })
-        
-        return ac_analysis
-    
-    def _ai_analyze_criterion(self, criterion: str, pr_diff: PRDiff) -> Dict[str, Any]:
+        Returns:
+            One analysis dictionary per criterion, in the same order, and the code review
+        """
+        prompt = self._build_combined_review_prompt(criteria, ticket_info, pr_diff)
+        max_tokens = min(2000 * (len(criteria) + 1), MAX_BATCH_RESPONSE_TOKENS)
+        
+        try:
+            data = self._load_json(self._call_ai(prompt, max_tokens=max_tokens, context=context,
+                                                 raise_on_truncation=True))
+        except _TruncatedResponse:
+            logger.info(f"Combined review of {len(criteria)} criteria hit the token limit")
+            data = None
+        except Exception as e:
+            logger.error(f"Combined AI review failed for {len(criteria)} criteria: {e}")
+            return ([self._failed_analysis(e) for _ in criteria],
+                    self._empty_code_review("Review failed due to AI service error"))
+        
+        analyses = self._batch_results(data, len(criteria))
+        ai_review = data.get("code_review") if isinstance(data, dict) else None
+        self._complete_batch(criteria, analyses, context, pr_key)
+        
+        if not isinstance(ai_review, dict):
+            logger.info("Combined review returned no code review, requesting it separately")
+            ai_review = self._ai_code_review(ticket_info, pr_diff, context)
+        
+        return analyses, ai_review
+    
+    def _ai_analyze_criterion(self, criterion: str, context: str, pr_key: str) -> Dict[str, Any]:
         """Use AI to analyze if a specific criterion is fulfilled."""
-        prompt = self._build_criterion_analysis_prompt(criterion, pr_diff)
+        prompt = self._build_criterion_analysis_prompt(criterion)
         
         try:
-            response = self._call_ai(prompt)
-            return self._parse_criterion_response(response)
+            response = self._call_ai(prompt, context=context)
+            analysis = self._load_json(response)
+            if not isinstance(analysis, dict):
+                return self._fallback_criterion_analysis(response)
+            
+            # Only well-formed analyses are cached
+            self.cache.set(self._criterion_cache_key(criterion, pr_key), analysis)
+            return analysis
         except Exception as e:
             logger.error(f"AI analysis failed for criterion: {e}")
-            return {
-                "fulfilled": False,
-                "confidence": 0.0,
-                "evidence": [],
-                "gaps": [f"Analysis failed: {str(e)}"],
-                "reasoning": "Could not analyze due to AI service error"
-            }
-    
-    def _ai_code_review(self, ticket_info: JiraTicketInfo, pr_diff: PRDiff) -> Dict[str, Any]:
+            return self._failed_analysis(e)
+    
+    def _complete_batch(self, criteria: List[str], analyses: List[Optional[Dict[str, Any]]],
+                        context: str, pr_key: str):
+        """
+        Cache the analyses a batch response returned and fill in the ones it missed.
+        
+        Args:
+            criteria: Acceptance criteria of the batch
+            analyses: Parsed analyses, None for criteria missing from the response;
+                updated in place
+            context: Shared PR context (see _build_pr_context)
+            pr_key: PR content key for caching (see _pr_content_key)
+        """
+        for criterion, analysis in zip(criteria, analyses):
+            if analysis is not None:
+                self.cache.set(self._criterion_cache_key(criterion, pr_key), analysis)
+        
+        missing = [i for i, analysis in enumerate(analyses) if analysis is None]
+        if not missing:
+            return
+        
+        # Halves get the full per-call token budget to themselves; a single criterion
+        # goes through the per-criterion prompt
+        logger.info(f"AI response missed {len(missing)} of {len(criteria)} criteria, splitting them into two calls")
+        middle = (len(missing) + 1) // 2
+        for half in (missing[:middle], missing[middle:]):
+            if half:
+                for i, analysis in zip(half, self._ai_analyze_criteria_batch([criteria[i] for i in half],
+                                                                             context, pr_key)):
+                    analyses[i] = analysis
+    
+    def _failed_analysis(self, error: Exception) -> Dict[str, Any]:
+        """Analysis for a criterion whose AI call failed."""
+        return {
+            "fulfilled": False,
+            "confidence": 0.0,
+            "evidence": [],
+            "gaps": [f"Analysis failed: {str(error)}"],
+            "reasoning": "Could not analyze due to AI service error"
+        }
+    
+    def _ai_code_review(self, ticket_info: JiraTicketInfo, pr_diff: PRDiff,
+                        context: Optional[str] = None) -> Dict[str, Any]:
         """Perform AI-powered general code review."""
         prompt = self._build_code_review_prompt(ticket_info, pr_diff)
         
         try:
-            response = self._call_ai(prompt)
+            context = context or self._build_pr_context(pr_diff, ticket_info.acceptance_criteria)
+            response = self._call_ai(prompt, context=context)
             return self._parse_code_review_response(response)
         except Exception as e:
             logger.error(f"AI code review failed: {e}")
-            return {
-                "security_issues": [],
-                "performance_concerns": [],
-                "maintainability_issues": [],
-                "positive_aspects": [],
-                "overall_assessment": "Review failed due to AI service error"
-            }
-    
-    def _build_criterion_analysis_prompt(self, criterion: str, pr_diff: PRDiff) -> str:
-        """Build prompt for analyzing a specific acceptance criterion."""
-        # Get relevant file changes (limit to avoid token limits)
-        relevant_changes = []
-        for file_change in pr_diff.file_changes[:10]:  # Limit to first 10 files
-            if file_change.patch:
-                relevant_changes.append(f"File: {file_change.filename}\n{file_change.patch[:1000]}")  # Limit patch size
-        
-        changes_text = "\n\n".join(relevant_changes)
-        
-        return f"""
-You are a senior code reviewer analyzing a pull request against specific acceptance criteria.
-
-**Acceptance Criterion to Evaluate:**
-{criterion}
-
-**Pull Request Information:**
-- Title: {pr_diff.title}
-- Description: {pr_diff.description[:500]}...
-- Files Changed: {pr_diff.total_files_changed}
-- Additions: +{pr_diff.total_additions}, Deletions: -{pr_diff.total_deletions}
-
-**Code Changes (relevant excerpts):**
-{changes_text}
-
-**Instructions:**
-Analyze whether this pull request fulfills the specific acceptance criterion above.
-
-Respond in JSON format:
-{{
-    "fulfilled": true/false,
-    "confidence": 0.0-1.0,
-    "evidence": ["specific evidence from code that supports fulfillment"],
-    "gaps": ["specific missing elements or concerns"],
-    "reasoning": "detailed explanation of your analysis"
-}}
-
-Be specific and reference actual code changes where possible.
-"""
+            return self._empty_code_review("Review failed due to AI service error")
+    
+    def _empty_code_review(self, assessment: str) -> Dict[str, Any]:
+        """Code review with no findings, for when the AI review did not run."""
+        return {
+            "security_issues": [],
+            "performance_concerns": [],
+            "maintainability_issues": [],
+            "positive_aspects": [],
+            "overall_assessment": assessment
+        }
+    
+    def _build_pr_context(self, pr_diff: PRDiff, criteria: Sequence[str] = ()) -> str:
+        """
+        Build the PR information and code excerpt block that opens every prompt.
+        
+        It depends only on the PR and the ticket's criteria, so it is identical
+        across the criteria and code review calls for a review and is sent as a
+        cacheable prefix.
+        """
+        changes_text = self._format_diff_excerpt(pr_diff, criteria)
+        
+        return _PR_CONTEXT_TMPL.substitute(
+            title=pr_diff.title,
+            description=pr_diff.description[:500],
+            files_changed=pr_diff.total_files_changed,
+            additions=pr_diff.total_additions,
+            deletions=pr_diff.total_deletions,
+            changes=changes_text
+        )
+    
+    def _format_diff_excerpt(self, pr_diff: PRDiff, criteria: Sequence[str] = ()) -> str:
+        """Join the patches most relevant to the criteria into one excerpt."""
+        return "\n\n".join([
+            f"File: {filename}\n{patch}"
+            for filename, patch in self._select_relevant_patches(pr_diff, criteria)
+        ])
+    
+    def _select_relevant_patches(self, pr_diff: PRDiff, criteria: Sequence[str],
+                                 budget: int = PATCH_EXCERPT_BUDGET) -> List[Tuple[str, str]]:
+        """
+        Pick patch excerpts to show the model, most relevant to the criteria first.
+        
+        Generated and vendored files are left out. The rest are ranked by how
+        many criterion keywords appear in their name or in the part of the patch
+        that would be shown, capped at MAX_RELEVANCE_HITS so long patches do not
+        win on size alone (ties keep PR order), and taken greedily until the
+        character budget is spent.
+        
+        Args:
+            pr_diff: PR diff information
+            criteria: Acceptance criteria the excerpt should support
+            budget: Total characters of patch text to include
+            
+        Returns:
+            (filename, truncated patch) pairs in the order to present them
+        """
+        keywords = frozenset().union(*[_criterion_keywords(criterion) for criterion in criteria])
+        
+        candidates = [(file_change.filename, file_change.patch) for file_change in pr_diff.file_changes
+                      if file_change.patch and not file_change.skip_scan]
+        if keywords:
+            def relevance(candidate: Tuple[str, str]) -> int:
+                text = f"{candidate[0]}\n{candidate[1][:MAX_PATCH_EXCERPT_CHARS]}".lower()
+                return min(sum(keyword in text for keyword in keywords), MAX_RELEVANCE_HITS)
+            candidates.sort(key=relevance, reverse=True)
+        
+        selected = []
+        remaining = budget
+        for filename, patch in candidates:
+            if remaining <= 0:
+                break
+            excerpt = patch[:min(remaining, MAX_PATCH_EXCERPT_CHARS)]
+            selected.append((filename, excerpt))
+            remaining -= len(excerpt)
+        
+        return selected
+    
+    def _build_criterion_analysis_prompt(self, criterion: str) -> str:
+        """Build the request, following the PR context, for analyzing a specific acceptance criterion."""
+        return _CRITERION_TMPL.substitute(
+            criterion=criterion
+        )
+    
+    def _build_criteria_batch_prompt(self, criteria: List[str]) -> str:
+        """Build the request, following the PR context, for analyzing several acceptance criteria."""
+        criteria_json = json.dumps([{"id": i, "text": c} for i, c in enumerate(criteria)], indent=2, ensure_ascii=False)
+        
+        return _CRITERIA_BATCH_TMPL.substitute(
+            criteria=criteria_json
+        )
+    
+    def _build_combined_review_prompt(self, criteria: List[str], ticket_info: JiraTicketInfo,
+                                      pr_diff: PRDiff) -> str:
+        """Build the request, following the PR context, for analyzing criteria and reviewing the code at once."""
+        criteria_json = json.dumps([{"id": i, "text": c} for i, c in enumerate(criteria)], indent=2, ensure_ascii=False)
+        
+        return _COMBINED_REVIEW_TMPL.substitute(
+            criteria=criteria_json,
+            ticket_key=ticket_info.ticket_key,
+            summary=ticket_info.summary,
+            problem=ticket_info.problem_description[:300],
+            pr_number=pr_diff.pr_number,
+            title=pr_diff.title,
+            files=[file_change.filename for file_change in pr_diff.file_changes[:10]]
+        )
     
     def _build_code_review_prompt(self, ticket_info: JiraTicketInfo, pr_diff: PRDiff) -> str:
-        """Build prompt for general code review."""
-        return f"""
-You are a senior software engineer performing a comprehensive code review.
-
-**Context:**
-- Jira Ticket: {ticket_info.ticket_key} - {ticket_info.summary}
-- Problem: {ticket_info.problem_description[:300]}
-- PR: #{pr_diff.pr_number} - {pr_diff.title}
-
-**Key Areas to Review:**
-1. Security vulnerabilities
-2. Performance implications  
-3. Code maintainability and readability
-4. Error handling
-5. Edge cases
-6. Architecture decisions
-
-**Files Changed:** {[f.filename for f in pr_diff.file_changes[:10]]}
-
-Provide a structured analysis in JSON format:
-{{
-    "security_issues": ["list of security concerns"],
-    "performance_concerns": ["list of performance issues"], 
-    "maintainability_issues": ["list of maintainability problems"],
-    "positive_aspects": ["list of good practices found"],
-    "overall_assessment": "summary assessment"
-}}
-
-Focus on actionable feedback and specific improvements.
-"""
+        """Build the request, following the PR context, for a general code review."""
+        return _CODE_REVIEW_TMPL.substitute(
+            ticket_key=ticket_info.ticket_key,
+            summary=ticket_info.summary,
+            problem=ticket_info.problem_description[:300],
+            pr_number=pr_diff.pr_number,
+            title=pr_diff.title,
+            files=[file_change.filename for file_change in pr_diff.file_changes[:10]]
+        )
+    
+    def _call_ai(self, prompt: str, max_tokens: int = 2000, context: Optional[str] = None,
+                 raise_on_truncation: bool = False) -> str:
+        """
+        Call the AI service with the given prompt, waiting for a free request slot.
+        
+        Args:
+            prompt: Request text
+            max_tokens: Maximum response tokens
+            context: Static text sent before the prompt; marked for prompt caching
+                where the provider supports it
+            raise_on_truncation: Raise _TruncatedResponse instead of returning the
+                partial text when the response stops at max_tokens
+            
+        Returns:
+            Response text
+        """
+        with _AI_CALL_SLOTS:
+            return self._request_completion(prompt, max_tokens, context, raise_on_truncation)
     
-    def _call_ai(self, prompt: str) -> str:
-        """Call the AI service with the given prompt."""
+    def _request_completion(self, prompt: str, max_tokens: int, context: Optional[str],
+                            raise_on_truncation: bool = False) -> str:
+        """
+        Send one completion request to the configured provider.
+        
+        Responses are streamed and the stream is closed as soon as a complete
+        JSON object has arrived, instead of waiting out any trailing text.
+        """
+        truncated = False
+        scanner = _JsonStreamScanner()
+        
         if self.provider == "anthropic":
-            response = self.client.messages.create(
+            content = [{"type": "text", "text": prompt}]
+            if context:
+                # Cache breakpoint after the shared PR context; only the request tail is reprocessed
+                content.insert(0, {"type": "text", "text": context, "cache_control": {"type": "ephemeral"}})
+            
+            with self.client.messages.stream(
                 model=self.model or "claude-3-sonnet-20240229",
-                max_tokens=2000,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text
+                max_tokens=max_tokens,
+                messages=[{"role": "user", "content": content}]
+            ) as stream:
+                for text in stream.text_stream:
+                    if scanner.feed(text):
+                        break
+                else:
+                    truncated = stream.get_final_message().stop_reason == "max_tokens"
         
         elif self.provider in ["openai", "ollama"]:
             # Default models for each provider
             default_model = "gpt-4" if self.provider == "openai" else "llama3.2:latest"
             model_name = self.model or default_model
             
-            response = self.client.chat.completions.create(
+            # A stable leading context lets OpenAI's automatic prefix caching apply
+            content = f"{context}\n{prompt}" if context else prompt
+            
+            stream = self.client.chat.completions.create(
                 model=model_name,
-                max_tokens=2000,
-                messages=[{"role": "user", "content": prompt}]
+                max_tokens=max_tokens,
+                messages=[{"role": "user", "content": content}],
+                stream=True
             )
-            return response.choices[0].message.content or ""
+            try:
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    if scanner.feed(chunk.choices[0].delta.content or ""):
+                        break
+                    truncated = chunk.choices[0].finish_reason == "length"
+            finally:
+                stream.close()
         
         else:
             raise ValueError(f"Unknown provider: {self.provider}")
+        
+        if truncated and raise_on_truncation:
+            raise _TruncatedResponse(f"Response stopped at {max_tokens} tokens")
+        return scanner.result
     
-    def _parse_criterion_response(self, response: str) -> Dict[str, Any]:
-        """Parse AI response for criterion analysis."""
+    def _load_json(self, response: str) -> Optional[Any]:
+        """
+        Decode an AI response as JSON, or return None if it is not valid JSON.
+        
+        A JSON object wrapped in code fences or surrounded by prose is
+        extracted and decoded rather than treated as unparseable.
+        """
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError
+        loads = orjson.loads if HAS_ORJSON else json.loads
         try:
-            import json
-            return json.loads(response)
+            return loads(response)
         except json.JSONDecodeError:
-            # Fallback parsing
-            return {
-                "fulfilled": "fulfilled" in response.lower(),
-                "confidence": 0.5,
-                "evidence": [],
-                "gaps": ["Could not parse AI response"],
-                "reasoning": response[:200] + "..."
-            }
+            pass
+        
+        text = self._extract_json(response)
+        if text is None:
+            return None
+        try:
+            return loads(text)
+        except json.JSONDecodeError:
+            return None
+    
+    def _extract_json(self, text: str) -> Optional[str]:
+        """Return the JSON object embedded in text, or None if there is none."""
+        match = _JSON_FENCE_RE.search(text)
+        if match:
+            return match.group(1)
+        
+        scanner = _JsonStreamScanner()
+        return scanner.json_text if scanner.feed(text) else None
+    
+    def _fallback_criterion_analysis(self, response: str) -> Dict[str, Any]:
+        """Analysis read from a criterion response that did not decode to a JSON object."""
+        return {
+            "fulfilled": "fulfilled" in response.lower(),
+            "confidence": 0.5,
+            "evidence": [],
+            "gaps": ["Could not parse AI response"],
+            "reasoning": response[:200] + "..."
+        }
+    
+    def _parse_criteria_batch_response(self, response: str, count: int) -> List[Optional[Dict[str, Any]]]:
+        """
+        Parse AI response for a batched criteria analysis.
+        
+        Args:
+            response: Raw AI response
+            count: Number of criteria in the batch
+            
+        Returns:
+            Analysis per criterion id, with None for criteria missing from the response
+        """
+        return self._batch_results(self._load_json(response), count)
+    
+    def _batch_results(self, data: Any, count: int) -> List[Optional[Dict[str, Any]]]:
+        """Map the "results" list of a decoded batch response to criterion ids."""
+        analyses = [None] * count
+        if not isinstance(data, dict) or not isinstance(data.get("results"), list):
+            return analyses
+        
+        for result in data["results"]:
+            criterion_id = result.get("id") if isinstance(result, dict) else None
+            if isinstance(criterion_id, int) and 0 <= criterion_id < count:
+                analyses[criterion_id] = result
+        
+        return analyses
     
     def _parse_code_review_response(self, response: str) -> Dict[str, Any]:
         """Parse AI response for code review."""
-        try:
-            import json
-            return json.loads(response)
-        except json.JSONDecodeError:
-            return {
-                "security_issues": [],
-                "performance_concerns": [],
-                "maintainability_issues": [],
-                "positive_aspects": [],
-                "overall_assessment": response[:200] + "..."
-            }
-    
-    def _calculate_overall_score(self, ac_analysis: List[Dict], code_quality: Dict, ai_review: Dict) -> float:
+        review = self._load_json(response)
+        if isinstance(review, dict):
+            return review
+        
+        return {
+            "security_issues": [],
+            "performance_concerns": [],
+            "maintainability_issues": [],
+            "positive_aspects": [],
+            "overall_assessment": response[:200] + "..."
+        }
+    
+    def _calculate_overall_score(self, ac_analysis: List[CriterionAnalysis], fulfilled_count: int,
+                                 total_issues: int, has_tests: bool, ai_review: Dict) -> float:
         """Calculate overall review score (0.0 to 1.0)."""
         # Acceptance criteria score (40% weight)
-        ac_score = 0.0
-        if ac_analysis:
-            fulfilled_count = sum(1 for ac in ac_analysis if ac["fulfilled"])
-            confidence_avg = sum(ac["confidence"] for ac in ac_analysis) / len(ac_analysis)
-            ac_score = (fulfilled_count / len(ac_analysis)) * confidence_avg
+        ac_score = self._acceptance_score(ac_analysis, fulfilled_count)
         
         # Code quality score (30% weight)
         quality_score = 1.0
-        total_issues = code_quality.get("summary", {}).get("total_issues", 0)
         if total_issues > 0:
             quality_score = max(0.0, 1.0 - (total_issues * 0.1))  # Reduce by 10% per issue
         
         # Test coverage score (20% weight)
-        test_score = 1.0 if code_quality.get("summary", {}).get("has_tests", False) else 0.3
+        test_score = 1.0 if has_tests else 0.3
         
         # AI review score (10% weight)
         ai_score = 0.8  # Default decent score if AI review works
@@ -358,14 +1066,21 @@ Focus on actionable feedback and specific improvements.
         overall_score = (ac_score * 0.4) + (quality_score * 0.3) + (test_score * 0.2) + (ai_score * 0.1)
         return min(1.0, max(0.0, overall_score))
     
-    def _determine_status(self, overall_score: float, ac_analysis: List[Dict], code_quality: Dict) -> ReviewStatus:
+    def _acceptance_score(self, ac_analysis: List[CriterionAnalysis], fulfilled_count: int) -> float:
+        """Fraction of criteria fulfilled, weighted by average confidence (0.0 to 1.0)."""
+        if not ac_analysis:
+            return 0.0
+        
+        confidence_avg = sum([ac.confidence for ac in ac_analysis]) / len(ac_analysis)
+        return (fulfilled_count / len(ac_analysis)) * confidence_avg
+    
+    def _determine_status(self, overall_score: float, ac_analysis: List[CriterionAnalysis], total_issues: int) -> ReviewStatus:
         """Determine the review status based on analysis."""
         # Critical failures
-        if code_quality.get("summary", {}).get("total_issues", 0) > 5:
+        if total_issues > MAX_QUALITY_ISSUES:
             return ReviewStatus.FAIL
         
-        unfulfilled_critical = sum(1 for ac in ac_analysis if not ac["fulfilled"] and ac["confidence"] > 0.7)
-        if unfulfilled_critical > 0:
+        if any(not ac.fulfilled and ac.confidence > 0.7 for ac in ac_analysis):
             return ReviewStatus.FAIL
         
         # Pass threshold
@@ -376,33 +1091,29 @@ Focus on actionable feedback and specific improvements.
         else:
             return ReviewStatus.FAIL
     
-    def _generate_suggestions(self, ac_analysis: List[Dict], code_quality: Dict, ai_review: Dict) -> List[str]:
+    def _generate_suggestions(self, ac_analysis: List[CriterionAnalysis], code_quality: Dict, ai_review: Dict) -> List[str]:
         """Generate improvement suggestions."""
-        suggestions = []
-        
-        # From acceptance criteria
-        for ac in ac_analysis:
-            if not ac["fulfilled"] and ac["gaps"]:
-                suggestions.extend(ac["gaps"])
-        
-        # From code quality
-        for smell in code_quality.get("code_smells", []):
-            suggestions.append(f"{smell['file']}: {smell['message']}")
-        
-        # From AI review
-        suggestions.extend(ai_review.get("maintainability_issues", []))
-        suggestions.extend(ai_review.get("performance_concerns", []))
+        # Sources are consumed lazily, so nothing past the limit is built
+        suggestions = chain(
+            # From acceptance criteria
+            (gap for ac in ac_analysis if not ac.fulfilled for gap in ac.gaps),
+            # From code quality
+            (f"{smell['file']}: {smell['message']}" for smell in code_quality.get("code_smells", [])),
+            # From AI review
+            ai_review.get("maintainability_issues", []),
+            ai_review.get("performance_concerns", [])
+        )
         
-        return suggestions[:10]  # Limit to top 10
+        return list(islice(suggestions, 10))  # Limit to top 10
     
-    def _identify_required_changes(self, ac_analysis: List[Dict], code_quality: Dict) -> List[str]:
+    def _identify_required_changes(self, ac_analysis: List[CriterionAnalysis], code_quality: Dict) -> List[str]:
         """Identify required changes for approval."""
         required = []
         
         # Critical AC failures
         for ac in ac_analysis:
-            if not ac["fulfilled"] and ac["confidence"] > 0.8:
-                required.append(f"Must fulfill: {ac['criterion']}")
+            if not ac.fulfilled and ac.confidence > 0.8:
+                required.append(f"Must fulfill: {ac.criterion}")
         
         # Critical quality issues
         critical_issues = [issue for issue in code_quality.get("issues", []) 
@@ -414,21 +1125,20 @@ Focus on actionable feedback and specific improvements.
     
     def _recommend_tests(self, ticket_info: JiraTicketInfo, pr_diff: PRDiff, code_quality: Dict) -> List[str]:
         """Recommend specific test cases."""
-        recommendations = []
-        
-        if not code_quality.get("test_coverage", {}).get("has_test_files", False):
-            recommendations.append("Add unit tests for the main functionality")
+        has_test_files = code_quality.get("test_coverage", {}).get("has_test_files", False)
         
-        # Based on acceptance criteria
-        for criterion in ticket_info.acceptance_criteria:
-            recommendations.append(f"Test case for: {criterion[:50]}...")
-        
-        # Based on file changes
-        for file_change in pr_diff.file_changes:
-            if not file_change.is_test_file and file_change.status == "added":
-                recommendations.append(f"Add tests for new file: {file_change.filename}")
+        # Sources are consumed lazily, so nothing past the limit is built
+        recommendations = chain(
+            [] if has_test_files else ["Add unit tests for the main functionality"],
+            # Based on acceptance criteria
+            (f"Test case for: {criterion[:50]}..." for criterion in ticket_info.acceptance_criteria),
+            # Based on file changes
+            (f"Add tests for new file: {file_change.filename}"
+             for file_change in pr_diff.file_changes
+             if file_change.status == "added" and not file_change.is_test_file)
+        )
         
-        return recommendations[:5]  # Limit to top 5
+        return list(islice(recommendations, 5))  # Limit to top 5
     
     def _generate_lgtm_comment(self, status: ReviewStatus, score: float) -> Optional[str]:
         """Generate LGTM comment for approved PRs."""
@@ -442,21 +1152,25 @@ Focus on actionable feedback and specific improvements.
         else:
             return "LGTM! ✅ Implementation meets requirements."
     
-    def _create_summary(self, status: ReviewStatus, score: float, ac_analysis: List[Dict], code_quality: Dict) -> str:
+    def _create_summary(self, status: ReviewStatus, score: float, ac_analysis: List[CriterionAnalysis],
+                        fulfilled_ac: int, total_issues: int, has_tests: bool) -> str:
         """Create a summary of the review."""
-        fulfilled_ac = sum(1 for ac in ac_analysis if ac["fulfilled"])
         total_ac = len(ac_analysis)
         
         summary_parts = [
             f"**Review Status:** {status.value.upper()}",
             f"**Overall Score:** {score:.1%}",
             f"**Acceptance Criteria:** {fulfilled_ac}/{total_ac} fulfilled",
-            f"**Code Quality Issues:** {code_quality.get('summary', {}).get('total_issues', 0)}",
-            f"**Test Coverage:** {'✅' if code_quality.get('summary', {}).get('has_tests', False) else '❌'}"
+            f"**Code Quality Issues:** {total_issues}",
+            f"**Test Coverage:** {'✅' if has_tests else '❌'}"
         ]
         
         return "\n".join(summary_parts)
 
-def create_review_engine(provider: str = "anthropic", model: str = None, base_url: str = None) -> ReviewEngine:
+def create_review_engine(provider: str = "anthropic", model: str = None, base_url: str = None,
+                         use_cache: bool = True, refresh_cache: bool = False,
+                         separate_code_review: bool = False, fast_fail: bool = False) -> ReviewEngine:
     """Factory function to create ReviewEngine with environment configuration."""
-    return ReviewEngine(provider=provider, model=model, base_url=base_url) 
\ No newline at end of file
+    return ReviewEngine(provider=provider, model=model, base_url=base_url,
+                        use_cache=use_cache, refresh_cache=refresh_cache,
+                        separate_code_review=separate_code_review, fast_fail=fast_fail) 
\ No newline at end of file
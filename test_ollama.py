@@ -5,12 +5,28 @@ Test script to verify Ollama connectivity and available models.
 
 import requests
 import json
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# One keep-alive session for every probe; idempotent requests are retried on
+# transient gateway errors and the final response is still returned for reporting.
+# Connection and read errors are not retried, so a missing server is reported at once
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(total=2, connect=0, read=0, backoff_factor=0.5,
+                      status_forcelist=(502, 503, 504), raise_on_status=False)
+)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
 
 def test_ollama_connection(base_url: str = "http://localhost:11434") -> bool:
     """Test if Ollama is running and accessible."""
     try:
-        response = requests.get(f"{base_url}/api/version", timeout=5)
+        response = _SESSION.get(f"{base_url}/api/version", timeout=5)
         if response.status_code == 200:
             version_info = response.json()
             print(f"✅ Ollama is running! Version: {version_info.get('version', 'unknown')}")
@@ -26,10 +42,18 @@ def test_ollama_connection(base_url: str = "http://localhost:11434") -> bool:
         print(f"❌ Error testing Ollama connection: {e}")
         return False
 
+def _request_ollama_models(base_url: str = "http://localhost:11434") -> requests.Response:
+    """Fetch the raw model list response."""
+    return _SESSION.get(f"{base_url}/api/tags", timeout=10)
+
 def list_ollama_models(base_url: str = "http://localhost:11434") -> List[Dict]:
     """List available Ollama models."""
+    return _print_ollama_models(lambda: _request_ollama_models(base_url))
+
+def _print_ollama_models(get_response: Callable[[], requests.Response]) -> List[Dict]:
+    """Report the models in a model list response, fetched by calling get_response."""
     try:
-        response = requests.get(f"{base_url}/api/tags", timeout=10)
+        response = get_response()
         if response.status_code == 200:
             data = response.json()
             models = data.get('models', [])
@@ -63,7 +87,7 @@ def test_ollama_chat(model: str = "llama3.2:latest", base_url: str = "http://loc
         }
         
         print(f"\n🧪 Testing chat with model: {model}")
-        response = requests.post(url, json=payload, timeout=30)
+        response = _SESSION.post(url, json=payload, timeout=30)
         
         if response.status_code == 200:
             data = response.json()
@@ -85,16 +109,20 @@ def main():
     print("🤖 LGTM Bot - Ollama Connectivity Test")
     print("=" * 40)
     
-    # Test basic connection
-    if not test_ollama_connection():
-        print("\n💡 To fix:")
-        print("   1. Install Ollama from https://ollama.ai")
-        print("   2. Run: ollama serve")
-        print("   3. Pull a model: ollama pull llama3.2:latest")
-        return False
-    
-    # List available models
-    models = list_ollama_models()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Fetch the model list while the version check runs; it is only reported once Ollama is up
+        models_future = executor.submit(_request_ollama_models)
+        
+        # Test basic connection
+        if not test_ollama_connection():
+            print("\n💡 To fix:")
+            print("   1. Install Ollama from https://ollama.ai")
+            print("   2. Run: ollama serve")
+            print("   3. Pull a model: ollama pull llama3.2:latest")
+            return False
+        
+        # List available models
+        models = _print_ollama_models(models_future.result)
     if not models:
         print("\n💡 No models found. Try pulling one:")
         print("   ollama pull llama3.2:latest")